@@ -10,6 +10,9 @@ if TYPE_CHECKING:
 
 
 class Action:
+    # Actions are made for every keypress and every monster turn, slots keep them small
+    __slots__ = ("entity",)
+
     def __init__(self, entity: Actor) -> None:
         super().__init__()
         self.entity = entity
@@ -35,16 +38,46 @@ class Action:
 # Subclass of action
 # Raise SystemExit
 class EscapeAction(Action):
+    __slots__ = ()
+
     def perform(self) -> None:
         raise SystemExit()
 
 
 class WaitAction(Action):
+    __slots__ = ()
+
     def perform(self) -> None:
         pass
 
 
+class TakeStairsAction(Action):
+    """Take the stairs the entity stands on, down if `down` else up"""
+    __slots__ = ("down",)
+
+    def __init__(self, entity: Actor, down: bool):
+        super().__init__(entity)
+        self.down = down
+
+    def perform(self) -> None:
+        engine = self.engine
+        game_map = engine.game_map
+        stairs = game_map.downstairs_location if self.down else game_map.upstairs_location
+        if engine.floors is None or (self.entity.x, self.entity.y) != stairs:
+            engine.message_log.add_message(
+                f"There are no stairs {'down' if self.down else 'up'} here.", color.impossible
+            )
+            return
+
+        engine.change_floor(engine.floors.depth + (1 if self.down else -1))
+        engine.message_log.add_message(
+            f"You {'descend' if self.down else 'ascend'} the staircase.", color.descend
+        )
+
+
 class ActionWithDirection(Action):
+    __slots__ = ("dx", "dy")
+
     def __init__(self, entity: Actor, dx: int, dy: int):
         super().__init__(entity)
 
@@ -72,6 +105,8 @@ class ActionWithDirection(Action):
 
 # Attacks an enemy
 class MeleeAction(ActionWithDirection):
+    __slots__ = ()
+
     def perform(self) -> None:
         target = self.target_actor
 
@@ -99,6 +134,8 @@ class MeleeAction(ActionWithDirection):
 
 
 class BumpAction(ActionWithDirection):
+    __slots__ = ()
+
     def perform(self) -> None:
         if self.target_actor:
             return MeleeAction(self.entity, self.dx, self.dy).perform()
@@ -110,6 +147,8 @@ class BumpAction(ActionWithDirection):
 # Subclass of action
 # Check if the move is inbounds and on a walkable tile, if neither is true we move the entity
 class MovementAction(ActionWithDirection):
+    __slots__ = ()
+
     def perform(self) -> None:
         dest_x, dest_y = self.dest_xy
 
@@ -0,0 +1,7 @@
+"""
+Benchmarks for the game's hot paths
+
+`python -m benchmarks` runs the suite of per-turn and per-frame benchmarks on fixed seed scenarios,
+see benchmarks/__main__.py for the options.
+The other modules are focused benchmarks, run one with `python -m benchmarks.<name>` from the project root
+"""
@@ -0,0 +1,95 @@
+"""
+Benchmark the per-turn and per-frame hot paths on fixed seed scenarios
+
+Examples:
+    python -m benchmarks                                  run everything and print the results
+    python -m benchmarks --scenario large --json out.json save the results of one scenario
+    python -m benchmarks --baseline base.json             fail if anything got slower than base.json
+    python -m benchmarks --level-cache .level_cache       set up from cached levels instead of generating them
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.harness import compare, load_results, measure, Result, save_results
+from benchmarks.scenarios import build_engine, new_console, Scenario, SCENARIOS
+import color
+from level_cache import LevelCache
+from message_log import MessageLog
+
+
+def hot_paths(
+        scenario: Scenario, level_cache: Optional[LevelCache] = None
+) -> List[Tuple[str, Callable[[], object]]]:
+    """Return the functions to time for a scenario, each set up and ready to call"""
+    engine = build_engine(scenario, level_cache)
+    console = new_console()
+
+    message_log = MessageLog()  # Keeps only the latest MAX_MESSAGES of these in memory
+    for i in range(100_000):
+        message_log.add_message(f"The Orc attacks the Player for {i} hit points, and it is a long message", color.white)
+
+    # Path from the monster furthest from the player
+    player = engine.player
+    monster = max(
+        (actor for actor in engine.game_map.actors if actor is not player),
+        key=lambda actor: abs(actor.x - player.x) + abs(actor.y - player.y),
+    )
+
+    def generate() -> None:
+        build_engine(scenario)
+
+    def render_messages() -> None:
+        message_log.render(console, x=21, y=45, width=40, height=5)
+
+    def update_fov() -> None:
+        # Forget what the FOV was last computed for, otherwise every call after the first returns right away
+        engine._fov_key = None
+        engine.update_fov()
+
+    return [
+        ("generate_dungeon", generate),
+        ("update_fov", update_fov),
+        ("update_fov_unchanged", engine.update_fov),  # After a turn the player didn't move, nothing is computed
+        ("handle_enemy_turns", engine.handle_enemy_turns),
+        ("game_map.render", lambda: engine.game_map.render(console, engine.camera)),
+        ("message_log.render", render_messages),
+        ("get_path_to", lambda: monster.ai.get_path_to(player.x, player.y)),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", help="default: all of them")
+    parser.add_argument("--runs", type=int, default=30, help="timed calls per benchmark")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--threshold", type=float, default=1.1, help="slowdown ratio counted as a regression")
+    parser.add_argument("--level-cache", help="load the scenario levels from a level cache in this directory")
+    args = parser.parse_args()
+
+    level_cache = LevelCache(args.level_cache) if args.level_cache else None
+
+    results: Dict[str, Result] = {}
+    for name in args.scenario or SCENARIOS:
+        scenario = SCENARIOS[name]
+        for path_name, function in hot_paths(scenario, level_cache):
+            # Generating is much slower than the rest, so it gets fewer runs
+            runs = max(3, args.runs // 5) if path_name == "generate_dungeon" else args.runs
+            result = results[f"{name}/{path_name}"] = measure(function, runs)
+            print(
+                f"{name + '/' + path_name:<40} median {result.median_ms:>9.3f} ms  p95 {result.p95_ms:>9.3f} ms  "
+                f"peak alloc {result.peak_alloc_bytes:>10,} B"
+            )
+
+    if args.json:
+        save_results(args.json, results)
+
+    if args.baseline and not compare(results, load_results(args.baseline), args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures the cost of a turn as the number of entities on the map grows
+
+Every actor bumps in a random direction each turn, so each turn does several
+blocking/actor lookups per actor. With the spatial index on GameMap the time per
+actor should stay flat as the entity count grows.
+
+Run with `python -m benchmarks.entity_lookup`
+"""
+from __future__ import annotations
+
+import random
+import time
+from typing import List
+
+from actions import BumpAction
+from benchmarks.scenarios import build_open_engine
+from components.ai import DIRECTIONS
+from engine import Engine
+import entity_factories
+
+MAP_SIZE = 400
+TURNS = 20
+ENTITY_COUNTS = (100, 1_000, 10_000, 50_000)
+
+
+def build_engine(entity_count: int, seed: int = 0) -> Engine:
+    """Build an engine on an open map with `entity_count` orcs scattered over it"""
+    rng = random.Random(seed)
+    engine = build_open_engine(MAP_SIZE, MAP_SIZE)
+
+    for _ in range(entity_count):
+        entity_factories.orc.spawn(
+            engine.game_map, rng.randint(1, MAP_SIZE - 2), rng.randint(1, MAP_SIZE - 2)
+        )
+    return engine
+
+
+def time_turns(engine: Engine, seed: int = 0) -> float:
+    """Return the average time of one turn, in seconds"""
+    rng = random.Random(seed)
+    actors: List = list(engine.game_map.actors)
+
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        for actor in actors:
+            dx, dy = rng.choice(DIRECTIONS)
+            BumpAction(actor, dx, dy).perform()
+    return (time.perf_counter() - start) / TURNS
+
+
+def main() -> None:
+    print(f"{'entities':>10} {'ms/turn':>10} {'us/actor':>10}")
+    for count in ENTITY_COUNTS:
+        engine = build_engine(count)
+        actor_count = sum(1 for _ in engine.game_map.actors)
+        turn_time = time_turns(engine)
+        print(f"{count:>10} {turn_time * 1000:>10.2f} {turn_time / actor_count * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Measures taking the stairs on large floors, and what generating the next floor in the background costs the turns
+
+On each floor the player waits a number of turns, while the floor below is generated on the background thread,
+then takes the stairs down. Between turns the main thread sleeps for a key press's worth of time, like the game
+does waiting for input, which is when the background thread gets most of its work done.
+For comparison, the time generating a floor takes, which is what the stairs would cost if the floor was generated
+when they are taken.
+
+Run with `python -m benchmarks.floors`
+"""
+from __future__ import annotations
+
+import statistics
+import time
+from typing import List
+
+from actions import TakeStairsAction, WaitAction
+from benchmarks.scenarios import build_engine, SCENARIOS
+from floors import Floors
+
+SCENARIO = SCENARIOS["large"]
+DESCENTS = 8
+TURNS_PER_FLOOR = 40
+THINK_SECONDS = 0.01  # Time between turns, a fast typist holding down a key
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:8.3f} ms"
+
+
+def main() -> None:
+    engine = build_engine(SCENARIO)
+    engine.floors = Floors(SCENARIO.seed, SCENARIO.level_params)
+    player = engine.player
+
+    generate_times = []
+    for depth in range(2, DESCENTS + 2):
+        start = time.perf_counter()
+        engine.floors.generate(engine, depth)
+        generate_times.append(time.perf_counter() - start)
+
+    engine.floors.start_prefetching(engine)
+    first_turns: List[float] = []  # The first turns on a floor, while the next one is being generated
+    later_turns: List[float] = []  # The last ones, once it is done
+    stairs: List[float] = []
+    for _ in range(DESCENTS):
+        for turn in range(TURNS_PER_FLOOR):
+            start = time.perf_counter()
+            engine.play_turn(WaitAction(player))
+            (first_turns if turn < TURNS_PER_FLOOR // 2 else later_turns).append(time.perf_counter() - start)
+            time.sleep(THINK_SECONDS)
+
+        assert engine.game_map.downstairs_location
+        player.place(*engine.game_map.downstairs_location)
+        start = time.perf_counter()
+        engine.play_turn(TakeStairsAction(player, down=True))
+        stairs.append(time.perf_counter() - start)
+
+    up = []
+    for _ in range(min(DESCENTS, engine.floors.max_kept)):
+        assert engine.game_map.upstairs_location
+        player.place(*engine.game_map.upstairs_location)
+        start = time.perf_counter()
+        engine.play_turn(TakeStairsAction(player, down=False))
+        up.append(time.perf_counter() - start)
+        time.sleep(THINK_SECONDS)
+
+    print(f"{SCENARIO.map_width}x{SCENARIO.map_height} floors, {DESCENTS} descents")
+    generate_median = ms(statistics.median(generate_times))
+    print(f"generating a floor            median {generate_median}  max {ms(max(generate_times))}")
+    print(f"turn taking the stairs down   median {ms(statistics.median(stairs))}  max {ms(max(stairs))}")
+    print(f"turn taking the stairs up     median {ms(statistics.median(up))}  max {ms(max(up))}  (kept floors)")
+    print(f"wait turn while prefetching   median {ms(statistics.median(first_turns))}  max {ms(max(first_turns))}")
+    print(f"wait turn after prefetching   median {ms(statistics.median(later_turns))}  max {ms(max(later_turns))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures Engine.update_fov on maps of different sizes
+
+The player steps back and forth across an open floor, so the FOV has to be recomputed every call,
+then waits in place, when it doesn't.
+
+Run with `python -m benchmarks.fov`
+"""
+from __future__ import annotations
+
+import time
+from typing import List
+
+from benchmarks.scenarios import build_open_engine
+from engine import Engine
+import tile_types
+
+MAP_SIZES = [(80, 43), (500, 500), (2000, 2000)]
+CALLS = 200
+
+
+def build_engine(width: int, height: int) -> Engine:
+    engine = build_open_engine(width, height)
+    # A few pillars, so the FOV has something to work around
+    engine.game_map.set_tiles((slice(2, -2, 5), slice(2, -2, 5)), tile_types.wall)
+    engine.update_fov()
+    return engine
+
+
+def median_ms(times: List[float]) -> float:
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def main() -> None:
+    for width, height in MAP_SIZES:
+        engine = build_engine(width, height)
+        player = engine.player
+
+        moving = []
+        for i in range(CALLS):
+            player.move(1 if i % 2 == 0 else -1, 0)
+            start = time.perf_counter()
+            engine.update_fov()
+            moving.append(time.perf_counter() - start)
+
+        waiting = []
+        for _ in range(CALLS):
+            start = time.perf_counter()
+            engine.update_fov()
+            waiting.append(time.perf_counter() - start)
+
+        print(
+            f"{width:>4}x{height:<4} after a move {median_ms(moving):8.3f} ms, "
+            f"after a wait {median_ms(waiting):8.3f} ms (medians of {CALLS})"
+        )
+
+
+if __name__ == "__main__":
+    main()
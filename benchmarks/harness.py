@@ -0,0 +1,89 @@
+"""Timing, result files and baseline comparison for the benchmark suite"""
+from __future__ import annotations
+
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Callable, Dict, NamedTuple
+
+import numpy as np  # type: ignore
+import tcod
+
+
+class Result(NamedTuple):
+    median_ms: float
+    p95_ms: float
+    peak_alloc_bytes: int  # Most memory allocated at once during one call
+    runs: int
+
+
+def measure(function: Callable[[], object], runs: int, warmup: int = 1) -> Result:
+    """Time `runs` calls of `function` and measure its allocations on one extra call"""
+    for _ in range(warmup):
+        function()
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # Allocations are measured on their own call, tracemalloc would slow down the timed ones
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        peak_alloc_bytes = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return Result(
+        median_ms=statistics.median(timings),
+        p95_ms=timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        peak_alloc_bytes=peak_alloc_bytes,
+        runs=runs,
+    )
+
+
+def save_results(path: str, results: Dict[str, Result]) -> None:
+    """Write results, plus the versions they were measured with, as JSON"""
+    data = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "tcod": tcod.__version__,
+            "machine": platform.machine(),
+        },
+        "results": {name: result._asdict() for name, result in results.items()},
+    }
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+
+
+def load_results(path: str) -> Dict[str, Result]:
+    with open(path) as file:
+        data = json.load(file)
+    return {name: Result(**result) for name, result in data["results"].items()}
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Result], threshold: float) -> bool:
+    """
+    Print how each result compares to the baseline
+    Returns False if any median got slower than the baseline by more than `threshold` (1.1 = 10% slower)
+    """
+    ok = True
+    print(f"{'benchmark':<40} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<40} {'-':>10} {result.median_ms:>10.3f}")
+            continue
+        ratio = result.median_ms / baseline[name].median_ms if baseline[name].median_ms else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{name:<40} {baseline[name].median_ms:>10.3f} {result.median_ms:>10.3f} {ratio:>7.2f}{flag}")
+    return ok
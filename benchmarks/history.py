@@ -0,0 +1,81 @@
+"""
+Measures the message history viewer on a very long history
+
+The log keeps its latest messages in memory and the rest in a spill file. Times indexing the history, drawing a
+frame of it at the bottom, middle and top, and searching it. For comparison, a frame the way the viewer used to draw
+it: a new console, then render_messages over every message up to the cursor, all of them kept in memory.
+
+Run with `python -m benchmarks.history`
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from typing import Callable, List
+
+import tcod
+
+from camera import SCREEN_HEIGHT, SCREEN_WIDTH
+import color
+from message_log import Message, MessageLog
+
+MESSAGE_COUNT = 1_000_000
+FRAMES = 50
+
+
+def message_text(i: int) -> str:
+    if i % 10 == 0:  # Some messages wrap over a few lines
+        return (
+            f"Message {i}: the Orc swings its axe at the Player, misses, and curses loudly in a language you don't know"
+        )
+    return f"Message {i}: the Orc attacks the Player for {i % 7} hit points"
+
+
+def median_ms(function: Callable[[], object], runs: int = FRAMES) -> float:
+    times: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        log = MessageLog(spill_path=os.path.join(directory, "history.txt"))
+        for i in range(MESSAGE_COUNT):
+            log.add_message(message_text(i), color.white)
+
+        log_console = tcod.console.Console(SCREEN_WIDTH - 6, SCREEN_HEIGHT - 6, order="F")
+        width, height = log_console.width - 2, log_console.height - 2
+
+        start = time.perf_counter()
+        index = log.history_index(width)
+        print(f"{len(log):,} messages, {index.line_count:,} lines: index built in {time.perf_counter() - start:.3f} s")
+        for i in range(100):
+            log.add_message(message_text(MESSAGE_COUNT + i), color.white)
+        start = time.perf_counter()
+        index = log.history_index(width)
+        print(f"reopened after 100 more messages, index refreshed in {(time.perf_counter() - start) * 1000:.3f} ms")
+
+        for name, line in (("bottom", index.line_count - 1), ("middle", index.line_count // 2), ("top", height - 1)):
+            print(f"frame at the {name:<6} {median_ms(lambda: index.render(log_console, 1, 1, height, line)):8.3f} ms")
+
+        queries = (("recent", f"Message {MESSAGE_COUNT - 10}:"), ("oldest", "Message 5:"), ("missing", "Dragon"))
+        for name, query in queries:
+            print(f"search {name:<8} {median_ms(lambda: log.find(query, len(log)), runs=5):8.3f} ms")
+
+    # The old viewer, with the whole history as Messages in memory
+    messages = [Message(message_text(i), color.white) for i in range(MESSAGE_COUNT)]
+    for name, cursor in (("bottom", MESSAGE_COUNT - 1), ("middle", MESSAGE_COUNT // 2), ("top", 0)):
+
+        def old_frame() -> None:
+            console = tcod.console.Console(SCREEN_WIDTH - 6, SCREEN_HEIGHT - 6)
+            MessageLog.render_messages(console, 1, 1, width, height, messages[: cursor + 1])
+
+        print(f"old frame at the {name:<6} {median_ms(old_frame):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
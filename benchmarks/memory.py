@@ -0,0 +1,72 @@
+"""
+Measures the memory used by each entity on a map, by each action object, and the memory allocated during a turn
+
+Run with `python -m benchmarks.memory`
+"""
+from __future__ import annotations
+
+import random
+import sys
+import tracemalloc
+
+from actions import BumpAction
+from benchmarks.scenarios import build_open_engine
+from components.ai import DIRECTIONS
+from engine import Engine
+import entity_factories
+
+MAP_SIZE = 200
+ENTITY_COUNT = 10_000
+TURNS = 10
+
+
+def build_engine() -> Engine:
+    engine = build_open_engine(MAP_SIZE, MAP_SIZE)
+    engine.update_fov()
+    return engine
+
+
+def bytes_per_entity(engine: Engine) -> float:
+    """Spawn ENTITY_COUNT orcs and return how much memory each one added"""
+    rng = random.Random(0)
+    # This includes each entity's share of the map's EntityStore and spatial index
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(ENTITY_COUNT):
+        entity_factories.orc.spawn(engine.game_map, rng.randint(1, MAP_SIZE - 2), rng.randint(1, MAP_SIZE - 2))
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / ENTITY_COUNT
+
+
+def object_size(obj: object) -> int:
+    """Return the size of an object plus its __dict__, if it has one"""
+    return sys.getsizeof(obj) + (sys.getsizeof(obj.__dict__) if hasattr(obj, "__dict__") else 0)
+
+
+def turn_allocations(engine: Engine) -> float:
+    """Return the peak bytes allocated during a turn where every actor bumps and the enemies take their turns"""
+    rng = random.Random(0)
+    actors = list(engine.game_map.actors)
+    peaks = []
+    tracemalloc.start()
+    for _ in range(TURNS):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        for actor in actors:
+            BumpAction(actor, *rng.choice(DIRECTIONS)).perform()
+        engine.handle_enemy_turns()
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def main() -> None:
+    engine = build_engine()
+    print(f"bytes per entity:            {bytes_per_entity(engine):,.0f}")
+    print(f"bytes per action:            {object_size(BumpAction(engine.player, 1, 0)):,}")
+    print(f"peak bytes allocated a turn: {turn_allocations(engine):,.0f} ({ENTITY_COUNT:,} actors)")
+
+
+if __name__ == "__main__":
+    main()
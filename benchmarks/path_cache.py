@@ -0,0 +1,60 @@
+"""
+Measures the HostileEnemy path cache on a long corridor chase
+
+The player walks down a long corridor with monsters following. The run is repeated
+with the cache effectively turned off (PATH_DRIFT_THRESHOLD below 0) to show the saving.
+
+Run with `python -m benchmarks.path_cache`
+"""
+from __future__ import annotations
+
+import time
+
+from actions import MovementAction
+from benchmarks.scenarios import build_open_engine
+from components import ai
+from engine import Engine
+import entity_factories
+
+CORRIDOR_LENGTH = 400
+MONSTER_COUNT = 20
+TURNS = 150
+
+
+def build_engine() -> Engine:
+    """Build a one tile wide corridor with the monsters lined up behind the player"""
+    engine = build_open_engine(CORRIDOR_LENGTH + 2, 3, (MONSTER_COUNT + 3, 1), floor=(slice(1, -1), 1))
+    engine.shared_pursuit = False
+
+    for x in range(1, MONSTER_COUNT + 1):
+        entity_factories.orc.spawn(engine.game_map, x, 1)
+
+    engine.game_map.visible[:] = True
+    return engine
+
+
+def run_chase(drift_threshold: int) -> None:
+    ai.PATH_DRIFT_THRESHOLD = drift_threshold
+    engine = build_engine()
+
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        MovementAction(engine.player, 1, 0).perform()
+        engine.handle_enemy_turns()
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"threshold {drift_threshold:>2}: {elapsed / TURNS * 1000:.3f} ms/turn, "
+        f"{engine.path_cache_hits} hits, {engine.path_cache_misses} misses"
+    )
+
+
+def main() -> None:
+    default = ai.PATH_DRIFT_THRESHOLD
+    run_chase(-1)
+    run_chase(default)
+    ai.PATH_DRIFT_THRESHOLD = default
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Measures how the enemy turn scales with the number of monsters on a huge map
+
+The map is one open 1000x1000 cave with monsters scattered evenly over it, so about as many are near the player
+whatever the total is. A turn should cost about the same for every population.
+
+Run with `python -m benchmarks.population`
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from benchmarks.scenarios import build_open_engine
+from engine import Engine
+import entity_factories
+
+MAP_SIZE = 1000
+POPULATIONS = [1_000, 10_000, 100_000]
+TURNS = 50
+
+
+def build_engine(population: int) -> Engine:
+    engine = build_open_engine(MAP_SIZE, MAP_SIZE)
+    player = engine.player
+
+    rng = random.Random(0)
+    locations = {(rng.randint(1, MAP_SIZE - 2), rng.randint(1, MAP_SIZE - 2)) for _ in range(population)}
+    locations.discard((player.x, player.y))
+    entity_factories.orc.spawn_many(engine.game_map, sorted(locations))
+    engine.update_fov()
+    return engine
+
+
+def main() -> None:
+    for population in POPULATIONS:
+        engine = build_engine(population)
+        times = []
+        for _ in range(TURNS):
+            start = time.perf_counter()
+            engine.handle_enemy_turns()
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"{population:>7,} monsters: handle_enemy_turns median {times[len(times) // 2] * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measures the pathing cost of an enemy turn when many monsters are chasing the player
+
+Compares the shared pursuit field against every monster computing its own path.
+With the shared field the time per turn should grow far slower than the monster count.
+
+Run with `python -m benchmarks.pursuit`
+"""
+from __future__ import annotations
+
+import random
+import time
+
+from benchmarks.scenarios import build_open_engine
+from engine import Engine
+import entity_factories
+
+MAP_SIZE = 120
+TURNS = 5
+MONSTER_COUNTS = (50, 200, 500, 1_000)
+
+
+def build_engine(monster_count: int, shared_pursuit: bool, seed: int = 0) -> Engine:
+    """Build an open map where every monster can see the player"""
+    rng = random.Random(seed)
+    engine = build_open_engine(MAP_SIZE, MAP_SIZE)
+    engine.shared_pursuit = shared_pursuit
+
+    for _ in range(monster_count):
+        x, y = rng.randint(1, MAP_SIZE - 2), rng.randint(1, MAP_SIZE - 2)
+        if not engine.game_map.get_entities_at_location(x, y):
+            entity_factories.orc.spawn(engine.game_map, x, y)
+
+    # Light up the whole map so every monster is chasing
+    engine.game_map.visible[:] = True
+    return engine
+
+
+def time_enemy_turns(engine: Engine) -> float:
+    """Return the average time of one enemy turn, in seconds"""
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        engine.handle_enemy_turns()
+    return (time.perf_counter() - start) / TURNS
+
+
+def main() -> None:
+    print(f"{'monsters':>10} {'shared ms':>10} {'paths ms':>10}")
+    for count in MONSTER_COUNTS:
+        shared = time_enemy_turns(build_engine(count, shared_pursuit=True))
+        paths = time_enemy_turns(build_engine(count, shared_pursuit=False))
+        print(f"{count:>10} {shared * 1000:>10.2f} {paths * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Measures saving and loading a game, for the default map and a 1000x1000 one
+
+The snapshot is the part of an autosave that runs on the turn loop, the write happens on a background thread.
+
+Run with `python -m benchmarks.save_load`
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+from benchmarks.harness import measure
+from benchmarks.scenarios import build_engine, Scenario, SCENARIOS
+import color
+import save_game
+
+HUGE = Scenario("huge", map_width=1000, map_height=1000, max_rooms=3000, max_monsters_per_room=2)
+
+
+def main() -> None:
+    print(f"{'scenario':<10} {'snapshot ms':>12} {'save ms':>10} {'load ms':>10} {'file KiB':>10}")
+    for scenario in (SCENARIOS["default"], HUGE):
+        engine = build_engine(scenario)
+        for i in range(500):
+            engine.message_log.add_message(f"Message number {i}", color.white)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "save.sav")
+            snapshot = measure(lambda: save_game.snapshot(engine), runs=10)
+            save = measure(lambda: save_game.save_game(engine, path), runs=10)
+            load = measure(lambda: save_game.load_game(path), runs=10)
+            size = os.path.getsize(path) / 1024
+
+        print(
+            f"{scenario.name:<10} {snapshot.median_ms:>12.2f} {save.median_ms:>10.2f} {load.median_ms:>10.2f} "
+            f"{size:>10,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Fixed seed game setups the benchmarks run against"""
+from __future__ import annotations
+
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from tcod.console import Console
+
+from camera import SCREEN_HEIGHT, SCREEN_WIDTH
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+from level_cache import LevelCache
+from setup_game import generate_level, LevelParams
+import tile_types
+
+
+class Scenario(NamedTuple):
+    name: str
+    map_width: int
+    map_height: int
+    max_rooms: int
+    max_monsters_per_room: int  # Monster density
+    room_min_size: int = 6
+    room_max_size: int = 10
+    seed: int = 0
+
+    @property
+    def level_params(self) -> LevelParams:
+        return LevelParams(**{field: getattr(self, field) for field in LevelParams._fields})
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in (
+        # The map main.py plays on
+        Scenario("default", map_width=80, map_height=43, max_rooms=30, max_monsters_per_room=2),
+        # Same map, packed with monsters
+        Scenario("crowded", map_width=80, map_height=43, max_rooms=30, max_monsters_per_room=10),
+        Scenario("large", map_width=300, map_height=300, max_rooms=600, max_monsters_per_room=3),
+    )
+}
+
+
+def build_engine(scenario: Scenario, level_cache: Optional[LevelCache] = None) -> Engine:
+    """
+    Return an engine with a freshly generated dungeon for the scenario, the same every time
+    With a `level_cache` the dungeon is only generated the first time
+    """
+    player = entity_factories.player.clone()
+    # Keep the player alive however many enemy turns a benchmark runs
+    player.fighter.max_hp = player.fighter.hp = 1_000_000
+
+    engine = Engine(player=player)
+    if level_cache:
+        engine.game_map = level_cache.load_or_generate(engine, scenario.seed, scenario.level_params)
+    else:
+        engine.game_map = generate_level(engine, scenario.seed, scenario.level_params)
+    engine.update_fov()
+    engine.camera.center_on(player.x, player.y, engine.game_map.width, engine.game_map.height)
+    return engine
+
+
+def build_open_engine(
+        width: int,
+        height: int,
+        player_location: Optional[Tuple[int, int]] = None,
+        floor: Any = (slice(1, -1), slice(1, -1)),  # Index of the tiles dug out, everything but the border by default
+) -> Engine:
+    """
+    Return an engine on a `width` x `height` map of walls with the `floor` tiles dug out and nobody but the player,
+    standing at `player_location` or in the middle of the map. Like in build_engine, the player can't die
+    """
+    player = entity_factories.player.clone()
+    player.fighter.max_hp = player.fighter.hp = 1_000_000
+
+    engine = Engine(player=player)
+    engine.game_map = GameMap(engine, width, height, entities=[player])
+    engine.game_map.set_tiles(floor, tile_types.floor)
+    player.place(*(player_location or (width // 2, height // 2)), engine.game_map)
+    return engine
+
+
+def new_console() -> Console:
+    """Return an off-screen console the size of the game window, the map is drawn through the camera's viewport"""
+    return Console(SCREEN_WIDTH, SCREEN_HEIGHT, order="F")
@@ -0,0 +1,70 @@
+"""
+Measures how fast monsters can be spawned, for stress levels with very many of them
+
+Compares copy.deepcopy of the prototype (how spawning used to work), Entity.spawn and Entity.spawn_many.
+
+Run with `python -m benchmarks.spawn`
+"""
+from __future__ import annotations
+
+import copy
+import random
+import time
+from typing import Callable, List, Tuple
+
+from benchmarks.scenarios import build_open_engine
+from entity import Entity
+import entity_factories
+from game_map import GameMap
+
+MAP_SIZE = 400
+SPAWN_COUNT = 100_000
+
+
+def build_map() -> GameMap:
+    return build_open_engine(MAP_SIZE, MAP_SIZE).game_map
+
+
+def deepcopy_spawn(prototype: Entity, gamemap: GameMap, locations: List[Tuple[int, int]]) -> None:
+    for x, y in locations:
+        clone = copy.deepcopy(prototype)
+        clone.x = x
+        clone.y = y
+        clone.parent = gamemap
+        gamemap.add_entity(clone)
+
+
+def spawn(prototype: Entity, gamemap: GameMap, locations: List[Tuple[int, int]]) -> None:
+    for x, y in locations:
+        prototype.spawn(gamemap, x, y)
+
+
+def spawn_many(prototype: Entity, gamemap: GameMap, locations: List[Tuple[int, int]]) -> None:
+    prototype.spawn_many(gamemap, locations)
+
+
+def run(name: str, spawner: Callable[[Entity, GameMap, List[Tuple[int, int]]], None], runs: int) -> float:
+    """Return the best time of `runs` runs, each on a fresh map"""
+    rng = random.Random(0)
+    locations = [(rng.randint(1, MAP_SIZE - 2), rng.randint(1, MAP_SIZE - 2)) for _ in range(SPAWN_COUNT)]
+    best = float("inf")
+    for _ in range(runs):
+        gamemap = build_map()
+        start = time.perf_counter()
+        spawner(entity_factories.orc, gamemap, locations)
+        best = min(best, time.perf_counter() - start)
+        assert len(gamemap.entities) == SPAWN_COUNT + 1
+
+    print(f"{name:<10} {best:7.3f} s for {SPAWN_COUNT:,} orcs, {SPAWN_COUNT / best:>9,.0f} spawns/s")
+    return best
+
+
+def main() -> None:
+    baseline = run("deepcopy", deepcopy_spawn, runs=1)  # Slow enough that one run is steady
+    for name, spawner in (("spawn", spawn), ("spawn_many", spawn_many)):
+        elapsed = run(name, spawner, runs=3)
+        print(f"{'':<10} {baseline / elapsed:.1f}x faster than deepcopy")
+
+
+if __name__ == "__main__":
+    main()
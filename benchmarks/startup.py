@@ -0,0 +1,134 @@
+"""
+Measures how long the game takes to start, in fresh interpreters
+
+Reports the import time of main.py's modules, from `python -X importtime`, the time of each step before the first
+frame on its own: importing main, loading the tileset, creating the window, starting a new game as main() does, through
+the level cache, and drawing and presenting the first frame. Then the time main() itself takes until the first frame
+is presented, where the new game is made on the startup thread while the window is created. Each run starts in an
+empty directory, so there's no save and the level cache is cold.
+SDL_VIDEODRIVER=dummy is used, its window costs next to nothing, so little of the loading has a window to overlap with.
+
+Run with `python -m benchmarks.startup`
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+RUNS = 5
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module import times at least this long, in milliseconds, are listed
+SHOWN_MS = 1.0
+
+# Timed in a fresh interpreter, prints one "step seconds" line per step
+STEPS_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+print("import main", time.perf_counter() - start)
+
+start = time.perf_counter()
+tileset = main.load_tileset()
+print("load tileset", time.perf_counter() - start)
+
+start = time.perf_counter()
+context = main.tcod.context.new_terminal(main.SCREEN_WIDTH, main.SCREEN_HEIGHT, tileset=tileset)
+print("create window", time.perf_counter() - start)
+
+start = time.perf_counter()
+engine = main.load_or_new_game(0)
+print("new game", time.perf_counter() - start)
+
+start = time.perf_counter()
+import tcod
+console = tcod.console.Console(main.SCREEN_WIDTH, main.SCREEN_HEIGHT, order="F")
+engine.event_handler.on_render(console)
+context.present(console)
+print("first frame", time.perf_counter() - start)
+"""
+
+# Runs main() until its first context.present, then leaves through SystemExit the way closing the window does
+MAIN_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import tcod.context
+
+present = tcod.context.Context.present
+
+def first_present(self, *args, **kwargs):
+    present(self, *args, **kwargs)
+    print("main() to first frame", time.perf_counter() - start)
+    raise SystemExit
+
+tcod.context.Context.present = first_present
+sys.argv = ["main.py", "--seed", "0"]
+import main
+main.main()
+"""
+
+
+def import_times() -> Dict[str, List[float]]:
+    """
+    Return the cumulative import time, in milliseconds for each run, of main, of the modules main imports itself and
+    of every module of the repo
+    """
+    local_modules = {name[:-3] for name in os.listdir(ROOT) if name.endswith(".py")}
+    times: Dict[str, List[float]] = {}
+    for _ in range(RUNS):
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import main"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stderr
+        # "import time: self [us] | cumulative | imported package", indented two more spaces for each level of nesting
+        lines = [line.split(":", 1)[1].split("|") for line in output.splitlines() if line.startswith("import time:")]
+        main_depth = next(len(name) - len(name.lstrip()) for _, _, name in lines if name.strip() == "main")
+        for _, cumulative, name in lines[1:]:
+            depth = len(name) - len(name.lstrip())
+            name = name.strip()
+            if depth <= main_depth + 2 or name.split(".")[0] in local_modules:
+                times.setdefault(name, []).append(int(cumulative) / 1000)
+    return times
+
+
+def step_times() -> Dict[str, List[float]]:
+    """Return the time of each startup step, then of main() until its first frame, in milliseconds for each run"""
+    times: Dict[str, List[float]] = {}
+    env = {**os.environ, "SDL_VIDEODRIVER": "dummy", "PYTHONPATH": ROOT}
+    for _ in range(RUNS):
+        for script in (STEPS_SCRIPT, MAIN_SCRIPT):
+            with tempfile.TemporaryDirectory() as directory:
+                tileset = "dejavu10x10_gs_tc.png"
+                os.symlink(os.path.join(ROOT, tileset), os.path.join(directory, tileset))
+                output = subprocess.run(
+                    [sys.executable, "-W", "ignore", "-c", script],
+                    cwd=directory, capture_output=True, text=True, check=True, env=env,
+                ).stdout
+            for line in output.splitlines():
+                step, seconds = line.rsplit(" ", 1)
+                times.setdefault(step, []).append(float(seconds) * 1000)
+    return times
+
+
+def main() -> None:
+    print(f"Import time of each module, median of {RUNS} fresh interpreters, cumulative ms")
+    medians = {name: statistics.median(times) for name, times in import_times().items()}
+    for name, median in sorted(medians.items(), key=lambda item: -item[1]):
+        if median >= SHOWN_MS:
+            print(f"  {name:<28} {median:8.1f}")
+
+    print(f"Startup steps, median of {RUNS} fresh interpreters, ms")
+    medians = {step: statistics.median(times) for step, times in step_times().items()}
+    total = medians.pop("main() to first frame")
+    for step, median in medians.items():
+        print(f"  {step:<28} {median:8.1f}")
+    print(f"  {'steps one after another':<28} {sum(medians.values()):8.1f}")
+    print(f"  {'main() to first frame':<28} {total:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""The part of the map shown on the console, it follows the player on maps bigger than the screen"""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+# Size of the console the game is drawn on, in tiles, which is the size of the window main.py opens
+SCREEN_WIDTH = 80
+SCREEN_HEIGHT = 50
+
+# Size of the top left area of the console the map is drawn on, the HUD is below it
+VIEWPORT_WIDTH = 80
+VIEWPORT_HEIGHT = 43
+
+
+class Camera:
+    """
+    x, y is the map position shown at the top left corner of the viewport
+    width, height is the size of the viewport in tiles. On the console it starts at 0, 0
+    """
+
+    def __init__(self, width: int = VIEWPORT_WIDTH, height: int = VIEWPORT_HEIGHT):
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+
+    def center_on(self, x: int, y: int, map_width: int, map_height: int) -> None:
+        """Move the viewport so x, y is in its middle, without scrolling past the edges of the map"""
+        self.x = max(0, min(x - self.width // 2, map_width - self.width))
+        self.y = max(0, min(y - self.height // 2, map_height - self.height))
+
+    def map_slices(self, map_width: int, map_height: int) -> Tuple[slice, slice]:
+        """Return the slices of the map arrays inside the viewport, smaller than it when the map is"""
+        return (
+            slice(self.x, min(self.x + self.width, map_width)),
+            slice(self.y, min(self.y + self.height, map_height)),
+        )
+
+    def map_to_screen(self, x: int, y: int) -> Tuple[int, int]:
+        return x - self.x, y - self.y
+
+    def screen_to_map(self, x: int, y: int) -> Optional[Tuple[int, int]]:
+        """Return the map position under a console tile, or None if the tile is outside the viewport"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        return x + self.x, y + self.y
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import List, Tuple, TYPE_CHECKING
+from collections import deque
+from typing import Deque, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np  # type: ignore
 import tcod
@@ -9,9 +10,103 @@ from actions import Action, MeleeAction, MovementAction, WaitAction
 
 if TYPE_CHECKING:
     from entity import Actor
+    from game_map import GameMap
+
+# Every direction an actor can step in
+DIRECTIONS = [(-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+# How many tiles the target can move away from where a cached path leads before the path is recomputed
+PATH_DRIFT_THRESHOLD = 2
+
+# How far from the target the shared pursuit field reaches. Monsters that can see the player are well inside it,
+# the rest is room for going around obstacles
+PURSUIT_RADIUS = 16
+
+# How far, in steps over walkable tiles, the player's scent and noise spread each turn
+SCENT_RADIUS = 16
+# Monsters chase the player when they can see them, or smell a trail at most CHASE_SCENT_AGE turns old.
+# With an older trail, up to WANDER_SCENT_AGE turns, they wander around. Past that they sleep.
+# The age of a fresh trail is how many steps away the player is, so monsters further than CHASE_SCENT_AGE steps out
+# of sight, or that fell that far behind, wander
+CHASE_SCENT_AGE = 10
+WANDER_SCENT_AGE = 40
+
+# Awareness levels, as computed by compute_awareness
+SLEEP = 0
+WANDER = 1
+CHASE = 2
+
+# Distance map value of tiles the target can't be reached from
+UNREACHABLE = np.iinfo(np.int32).max
+
+# Scent of tiles the player was never near, old enough for any turn count
+NO_SCENT = -(2 ** 30)
+
+
+class PursuitField(NamedTuple):
+    """Dijkstra distance map rooted at a target, covering the square of PURSUIT_RADIUS around it"""
+    distance: np.ndarray
+    x: int  # Map position of distance[0, 0]
+    y: int
+
+    def reaches(self, x: int, y: int) -> bool:
+        """Return True if x, y is inside the field and the target can be walked to from it without leaving the field"""
+        local_x, local_y = x - self.x, y - self.y
+        width, height = self.distance.shape
+        return 0 <= local_x < width and 0 <= local_y < height and self.distance[local_x, local_y] != UNREACHABLE
+
+
+def compute_pursuit_field(gamemap: GameMap, target_x: int, target_y: int) -> PursuitField:
+    """
+    Return a Dijkstra distance map rooted at the target
+    Walking downhill on this map from any tile leads to the target, unreachable tiles keep the max int32 value
+    Only the square around the target is covered, so the cost doesn't grow with the size of the map
+    """
+    x1, y1 = max(target_x - PURSUIT_RADIUS, 0), max(target_y - PURSUIT_RADIUS, 0)
+    x2 = min(target_x + PURSUIT_RADIUS + 1, gamemap.width)
+    y2 = min(target_y + PURSUIT_RADIUS + 1, gamemap.height)
+
+    distance = tcod.path.maxarray((x2 - x1, y2 - y1), dtype=np.int32, order="F")
+    distance[target_x - x1, target_y - y1] = 0
+
+    tcod.path.dijkstra2d(distance, gamemap.cost[x1:x2, y1:y2], 2, 3, out=distance)
+
+    return PursuitField(distance, x1, y1)
+
+
+def spread_scent(gamemap: GameMap, x: int, y: int, turn: int) -> None:
+    """
+    Lay the player's scent from x, y over the walkable tiles within SCENT_RADIUS steps
+    gamemap.scent holds the turn a tile was last smelled on, less how many steps it was from the player. Tiles aren't
+    touched again as the scent fades: its age is the current turn minus that value
+    """
+    x1, y1 = max(x - SCENT_RADIUS, 0), max(y - SCENT_RADIUS, 0)
+    x2, y2 = min(x + SCENT_RADIUS + 1, gamemap.width), min(y + SCENT_RADIUS + 1, gamemap.height)
+    window = slice(x1, x2), slice(y1, y2)
+
+    # Monsters don't stop the scent, so only the tiles are used for the cost
+    steps = tcod.path.maxarray((x2 - x1, y2 - y1), dtype=np.int32, order="F")
+    steps[x - x1, y - y1] = 0
+    tcod.path.dijkstra2d(steps, gamemap.tiles["walkable"][window].astype(np.int8), 1, 1, out=steps)
+
+    scent = gamemap.scent[window]
+    reached = steps <= SCENT_RADIUS
+    scent[reached] = np.maximum(scent[reached], turn - steps[reached])
+
+
+def compute_awareness(gamemap: GameMap, rows: np.ndarray, turn: int) -> np.ndarray:
+    """Return the awareness level (SLEEP, WANDER or CHASE) of the actors in the given EntityStore rows, all at once"""
+    store = gamemap.store
+    xs, ys = store.x[rows], store.y[rows]
+    scent_age = turn - gamemap.scent[xs, ys]
+    chase = gamemap.visible[xs, ys] | (scent_age <= CHASE_SCENT_AGE)
+    return np.where(chase, CHASE, np.where(scent_age <= WANDER_SCENT_AGE, WANDER, SLEEP))
 
 
 class BaseAI(Action):
+    # How aware of the player the actor is this turn, set by Engine.handle_enemy_turns before perform is called
+    __slots__ = ("awareness",)
+
     entity: Actor
 
     def perform(self) -> None:
@@ -22,19 +117,8 @@ class BaseAI(Action):
         Computer and return a path to the target position
         If there is no valid path then returns an empty list
         """
-        # Copy the walkable array
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
-
-        for entity in self.entity.gamemap.entities:
-            # Check that an entity blocks movement and the cost isn't zero (blocking)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position
-                # A lower number means more enemies will crowd behind each other in hallways
-                # A higher number means enemies will take longer paths in order to surround the player
-                cost[entity.x, entity.y] += 10
-
-        # Create a graph from the cost array and pass that graph to a new pathfinder
-        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+        # Create a graph from the maps cost array and pass that graph to a new pathfinder
+        graph = tcod.path.SimpleGraph(cost=self.entity.gamemap.cost, cardinal=2, diagonal=3)
         pathfinder = tcod.path.Pathfinder(graph)
 
         pathfinder.add_root((self.entity.x, self.entity.y))  # Start position
@@ -45,35 +129,132 @@ class BaseAI(Action):
         # Convert from List[List[int]] to List[Tuple[int, int]]
         return [(index[0], index[1]) for index in path]
 
+    def get_scent_step(self, scent: np.ndarray) -> Optional[Tuple[int, int]]:
+        """
+        Return the dx, dy of the free neighbouring tile with the freshest scent
+        If no neighbour smells fresher than where the entity stands then returns None
+        """
+        gamemap = self.entity.gamemap
+        x, y = self.entity.x, self.entity.y
+        best_scent = scent[x, y]
+        best_step: Optional[Tuple[int, int]] = None
+
+        for dx, dy in DIRECTIONS:
+            step_x, step_y = x + dx, y + dy
+            if not gamemap.in_bounds(step_x, step_y):
+                continue
+            if scent[step_x, step_y] > best_scent and not gamemap.get_blocking_entity_at_location(step_x, step_y):
+                best_scent = scent[step_x, step_y]
+                best_step = dx, dy
+
+        return best_step
+
+    def get_downhill_step(self, field: PursuitField) -> Optional[Tuple[int, int]]:
+        """
+        Return the dx, dy of the free neighbouring tile with the lowest value on a distance map
+        If no neighbour is closer than where the entity stands, or the entity is outside the map, then returns None
+        """
+        gamemap = self.entity.gamemap
+        distance = field.distance
+        width, height = distance.shape
+        x, y = self.entity.x, self.entity.y
+        # Position on the distance map
+        local_x, local_y = x - field.x, y - field.y
+        if not (0 <= local_x < width and 0 <= local_y < height):
+            return None
+        best_distance = distance[local_x, local_y]
+        best_step: Optional[Tuple[int, int]] = None
+
+        for dx, dy in DIRECTIONS:
+            step_x, step_y = local_x + dx, local_y + dy
+            if not (0 <= step_x < width and 0 <= step_y < height):
+                continue
+            if distance[step_x, step_y] < best_distance and not gamemap.get_blocking_entity_at_location(
+                    x + dx, y + dy
+            ):
+                best_distance = distance[step_x, step_y]
+                best_step = dx, dy
+
+        return best_step
+
 
 # Class for enemies
 class HostileEnemy(BaseAI):
     """
-    If the entity is not in the player’s vision, simply wait.
+    Sleeping enemies wait, wandering ones take random steps, see compute_awareness for how that's decided.
+    Chasing enemies:
     If the player is right next to the entity (distance <= 1), attack the player.
-    If the player can see the entity, but the entity is too far away to attack, then move towards the player.
+    If the player can see the entity, but the entity is too far away to attack, then move towards the player, downhill
+    on the shared pursuit field. When the way to the player leaves that field, follow a path of its own instead, kept
+    between turns (see update_path).
+    If the player can't see the entity, follow the player's scent.
     """
+    __slots__ = ("path", "path_key")
+
     def __init__(self, entity: Actor):
         super().__init__(entity)
-        self.path: List[Tuple[int, int]] = []
+        self.awareness = CHASE
+        self.path: Deque[Tuple[int, int]] = deque()
+        # Target x, y and map version the current path was computed for
+        self.path_key: Optional[Tuple[int, int, int]] = None
 
     def perform(self) -> None:
+        if self.awareness == SLEEP:
+            return WaitAction(self.entity).perform()
+        if self.awareness == WANDER:
+            return MovementAction(self.entity, *self.engine.rng.choice(DIRECTIONS)).perform()
+
         target = self.engine.player
-        dx = target.x - self.entity.x
-        dy = target.y - self.entity.y
+        x, y = self.entity.x, self.entity.y
+        dx = target.x - x
+        dy = target.y - y
         distance = max(abs(dx), abs(dy))  # Chebyshev distance
 
-        if self.engine.game_map.visible[self.entity.x, self.entity.y]:
-            if distance <= 1:
-                return MeleeAction(self.entity, dx, dy).perform()
+        if not self.engine.game_map.visible[x, y]:
+            # Out of sight, the scent trail is fresher than wherever the last path led
+            self.path.clear()
+            step = self.get_scent_step(self.engine.game_map.scent)
+            if step:
+                return MovementAction(self.entity, *step).perform()
+            return WaitAction(self.entity).perform()
 
-            self.path = self.get_path_to(target.x, target.y)
+        if distance <= 1:
+            return MeleeAction(self.entity, dx, dy).perform()
 
+        if self.engine.shared_pursuit and self.engine.pursuit_field.reaches(x, y):
+            # Follow the distance map shared by every monster chasing the player this turn
+            step = self.get_downhill_step(self.engine.pursuit_field)
+            if step:
+                return MovementAction(self.entity, *step).perform()
+            return WaitAction(self.entity).perform()
+
+        self.update_path(target.x, target.y)
         if self.path:
-            dest_x, dest_y = self.path.pop(0)
-            return MovementAction(
-                self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
-            ).perform()
+            dest_x, dest_y = self.path.popleft()
+            return MovementAction(self.entity, dest_x - x, dest_y - y).perform()
 
         # Player or enemy decides to wait where they are rather than taking a turn
         return WaitAction(self.entity).perform()
+
+    def update_path(self, target_x: int, target_y: int) -> None:
+        """
+        Keep following the cached path while it is still good, otherwise compute a new one
+        The cached path is dropped when the map changed, the target moved more than PATH_DRIFT_THRESHOLD tiles
+        away from where the path leads, or the next step is no longer next to this entity or is blocked
+        """
+        gamemap = self.entity.gamemap
+        if self.path and self.path_key:
+            path_x, path_y, version = self.path_key
+            next_x, next_y = self.path[0]
+            if (
+                    version == gamemap.version
+                    and max(abs(target_x - path_x), abs(target_y - path_y)) <= PATH_DRIFT_THRESHOLD
+                    and max(abs(next_x - self.entity.x), abs(next_y - self.entity.y)) == 1
+                    and not gamemap.get_blocking_entity_at_location(next_x, next_y)
+            ):
+                self.engine.path_cache_hits += 1
+                return
+
+        self.engine.path_cache_misses += 1
+        self.path = deque(self.get_path_to(target_x, target_y))
+        self.path_key = target_x, target_y, gamemap.version
@@ -1,25 +1,54 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import Optional, TYPE_CHECKING
 
 import color
 from components.base_component import BaseComponent
-from input_handlers import GameOverEventHandler
+from entity_store import Column
 from render_order import RenderOrder
 
 if TYPE_CHECKING:
     from entity import Actor
+    from entity_store import EntityStore
 
 
 class Fighter(BaseComponent):
+    """
+    The stats are stored in the EntityStore row of the parent actor while it is on a map
+    hp, read on every attack, stays on the fighter and is copied into its column by the hp setter
+    """
+    __slots__ = (
+        "_hp", "_store", "_row", "_detached_max_hp", "_detached_defense", "_detached_power"
+    )
+
     parent: Actor
 
+    max_hp = Column("max_hp")
+    defense = Column("defense")
+    power = Column("power")
+
+    # Same row as the parent, set by the EntityStore
+    _store: Optional[EntityStore]
+    _row: int
+
     def __init__(self, hp: int, defense: int, power: int):
+        self._store = None
         self.max_hp = hp  # Hit Points
         self._hp = hp
         self.defense = defense  # How much taken damage will be reduced
         self.power = power  # Raw attack power
 
+    def clone(self, parent: Actor) -> Fighter:
+        """Return a new fighter with the same stats for the given actor, used by Actor.clone"""
+        clone = Fighter.__new__(Fighter)
+        clone.parent = parent
+        clone._store = None
+        clone._hp = self._hp
+        clone._detached_max_hp = self.max_hp
+        clone._detached_defense = self.defense
+        clone._detached_power = self.power
+        return clone
+
     @property  # Getter method, just returns the hp
     def hp(self) -> int:
         return self._hp
@@ -27,6 +56,8 @@ class Fighter(BaseComponent):
     @hp.setter
     def hp(self, value: int) -> None:
         self._hp = max(0, min(value, self.max_hp))  # Hp will never be less than 0, and can't go higher than max
+        if self._store is not None:
+            self._store.hp[self._row] = self._hp
         if self._hp == 0 and self.parent.ai:  # if hp is 0, kill the entity
             self.die()
 
@@ -35,6 +66,8 @@ class Fighter(BaseComponent):
         if self.engine.player is self.parent:
             death_message = "You died!"
             death_message_color = color.player_die
+            # Imported here, so loading fighters (headless runs, the level cache) doesn't load the event handlers
+            from input_handlers import GameOverEventHandler
             self.engine.event_handler = GameOverEventHandler(self.engine)
         else:
             death_message = f"{self.parent.name} is dead!"
@@ -48,6 +81,7 @@ class Fighter(BaseComponent):
 
         # Set blocks_movement to False, so that the entities can walk over the corpse
         self.parent.blocks_movement = False
+        self.gamemap.update_entity(self.parent)
 
         # Remove the AI from the entity, so it’ll be marked as dead and won’t take any more turns
         self.parent.ai = None
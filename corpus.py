@@ -0,0 +1,101 @@
+"""
+Generate a corpus of seeded levels across a pool of processes
+
+Each level is saved to its own compressed .npz file, and a line of summary stats is added to
+manifest.jsonl in the output directory, e.g.
+`python corpus.py --count 1000 --out levels --workers 8`
+
+Every level gets its own random.Random seeded with the level's seed, so the files are the same
+whichever worker generates them, and however many workers there are.
+"""
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+from typing import Any, Dict
+
+import numpy as np  # type: ignore
+
+from engine import Engine
+import entity_factories
+from entity import Actor
+from game_map import GameMap
+from setup_game import generate_level, LevelParams
+
+
+def save_level(path: str, game_map: GameMap) -> None:
+    """
+    Save the tiles and entities of a level
+    Entities are saved as columns, their kind being an index into the saved `kinds` names
+    """
+    entities = sorted(game_map.entities, key=lambda entity: (entity.x, entity.y))
+    kinds = sorted({entity.name for entity in entities})
+    np.savez_compressed(
+        path,
+        tiles=game_map.tiles,
+        entity_x=np.array([entity.x for entity in entities], dtype=np.int32),
+        entity_y=np.array([entity.y for entity in entities], dtype=np.int32),
+        entity_kind=np.array([kinds.index(entity.name) for entity in entities], dtype=np.uint8),
+        kinds=np.array(kinds),
+    )
+
+
+def level_stats(game_map: GameMap) -> Dict[str, Any]:
+    """Return the summary stats used to vet a level"""
+    player = game_map.engine.player
+    return {
+        "room_count": len(game_map.rooms),
+        "floor_ratio": round(float(game_map.tiles["walkable"].mean()), 4),
+        "monster_count": sum(
+            1 for entity in game_map.entities if isinstance(entity, Actor) and entity is not player
+        ),
+    }
+
+
+def build_level(seed: int, params: LevelParams, out_dir: str) -> Dict[str, Any]:
+    """Generate and save one level, then return its manifest entry. This is what runs on the workers"""
+    start = time.perf_counter()
+    # generate_dungeon places the player, so every level gets its own throwaway engine and player
+    game_map = generate_level(Engine(player=entity_factories.player.clone()), seed, params)
+    generate_ms = (time.perf_counter() - start) * 1000
+
+    file_name = f"level_{seed}.npz"
+    save_level(os.path.join(out_dir, file_name), game_map)
+
+    return {"seed": seed, "file": file_name, "generate_ms": round(generate_ms, 3), **level_stats(game_map)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate seeded levels in parallel")
+    parser.add_argument("--count", type=int, default=100, help="number of levels to generate")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first level, the rest count up from it")
+    parser.add_argument("--out", default="levels", help="directory to write the levels to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    defaults = LevelParams()
+    for field in LevelParams._fields:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=getattr(defaults, field))
+    args = parser.parse_args()
+
+    params = LevelParams(**{field: getattr(args, field) for field in LevelParams._fields})
+    os.makedirs(args.out, exist_ok=True)
+    seeds = range(args.seed, args.seed + args.count)
+
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as executor, open(
+            os.path.join(args.out, "manifest.jsonl"), "a"
+    ) as manifest:
+        # Send the seeds in chunks, so the workers don't spend their time waiting on the pool
+        chunksize = max(1, args.count // (args.workers * 4))
+        for entry in executor.map(build_level, seeds, [params] * args.count, [args.out] * args.count,
+                                  chunksize=chunksize):
+            manifest.write(json.dumps(entry) + "\n")
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.count} levels in {elapsed:.2f}s with {args.workers} workers, {args.count / elapsed:,.1f} levels/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,176 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import random
+from time import perf_counter
+from typing import Optional, Tuple, TYPE_CHECKING
 
 from tcod.console import Console
 from tcod.map import compute_fov
 
-from input_handlers import MainGameEventHandler
+from camera import Camera
+from components.ai import compute_pursuit_field, PursuitField, spread_scent
 from message_log import MessageLog
-from render_functions import render_bar, render_names_at_mouse_location
+from profiler import ACTION, ENEMY_TURNS, MAP_RENDER, MESSAGE_RENDER, Profiler, UPDATE_FOV
+from render_functions import render_bar, render_dungeon_level, render_names_at_mouse_location, render_perf_overlay
+from scheduler import Scheduler
 
 if TYPE_CHECKING:
+    from actions import Action
     from entity import Actor
+    from floors import Floors
     from game_map import GameMap
     from input_handlers import EventHandler
+    from replay import ActionRecorder
+    from save_game import Autosaver
+
+# How far the player can see
+FOV_RADIUS = 8
 
 
 class Engine:
     """
         entities is a set of entities
-        event_handler handles events
+        event_handler handles events, it is only made when first asked for so games without a window (headless runs,
+        replays) don't import the event handlers
         player is the player entity
+        shared_pursuit makes hostile monsters chase the player on one shared distance map, only those whose way to the
+        player leaves it compute their own path. Without it every monster does
+        path_cache_hits and path_cache_misses count how often monsters could keep following their cached path
+        autosaver, if set, is told about every turn the player takes
+        turn counts the enemy turns played, the player's scent fades as it goes up
+        rng is the random number generator the monsters use, new_game seeds it
+        scheduler decides which monsters act each turn, and in which order
+        camera is the part of the map drawn on the console, it is centered on the player when rendering
+        mouse_location is the console tile under the mouse. The map position under it depends on where the camera is,
+        which moves with the player, so it is looked up through the camera when it is needed
+        dirty is set when the screen needs drawing again: after a turn, a change of event handler, or when the mouse
+        moves onto another tile. main.py only draws a frame while it is set
+        profiler, if set, times the phases of every turn and frame
+        recorder, if set, records the player's actions so the game can be replayed
+        floors holds the floors of the dungeon, game_map is the one the player is on. None for a single map
     """
     game_map: GameMap
 
     def __init__(self, player: Actor):
-        self.event_handler: EventHandler = MainGameEventHandler(self)
+        self.dirty = True
+        self._event_handler: Optional[EventHandler] = None
         self.message_log = MessageLog()
+        self.camera = Camera()
         self.mouse_location = (0, 0)
         self.player = player
+        self.shared_pursuit = True
+        self._pursuit_field: Optional[PursuitField] = None
+        self.path_cache_hits = 0
+        self.path_cache_misses = 0
+        self.autosaver: Optional[Autosaver] = None
+        self.profiler: Optional[Profiler] = None
+        self.recorder: Optional[ActionRecorder] = None
+        self.floors: Optional[Floors] = None
+        self.turn = 0
+        self.rng = random.Random()
+        self.scheduler = Scheduler()
+        self._fov_key: Optional[Tuple[GameMap, int, int, int]] = None  # What the FOV was last computed for
+
+    @property
+    def event_handler(self) -> EventHandler:
+        if self._event_handler is None:
+            from input_handlers import MainGameEventHandler
+
+            self._event_handler = MainGameEventHandler(self)
+        return self._event_handler
+
+    @event_handler.setter
+    def event_handler(self, event_handler: EventHandler) -> None:
+        self._event_handler = event_handler
+        self.dirty = True  # The new handler draws something else
+
+    @property
+    def pursuit_field(self) -> PursuitField:
+        """Distance map rooted at the player, computed at most once per turn"""
+        if self._pursuit_field is None:
+            self._pursuit_field = compute_pursuit_field(self.game_map, self.player.x, self.player.y)
+        return self._pursuit_field
+
+    def play_turn(self, action: Action) -> None:
+        """Perform the player's action, then let the enemies act and update the FOV before the player's next action"""
+        profiler = self.profiler
+        if profiler is None:
+            action.perform()
+            self.handle_enemy_turns()
+            self.update_fov()
+            return
+
+        start = perf_counter()
+        action.perform()
+        action_end = perf_counter()
+        self.handle_enemy_turns()
+        enemy_turns_end = perf_counter()
+        self.update_fov()
+        profiler.record_turn(ACTION, action_end - start)
+        profiler.record_turn(ENEMY_TURNS, enemy_turns_end - action_end)
+        profiler.record_turn(UPDATE_FOV, perf_counter() - enemy_turns_end)
+        profiler.end_turn()
+
+    def change_floor(self, depth: int) -> None:
+        """Move the player to floor `depth`, onto the stairs leading back to the floor they come from"""
+        assert self.floors
+        going_down = depth > self.floors.depth
+        game_map = self.floors.enter(self, depth)
+        location = game_map.upstairs_location if going_down else game_map.downstairs_location
+        assert location, "Stairs lead to a floor without stairs back"
+        # A monster may be standing on the stairs, the player then arrives next to it
+        self.player.place(*game_map.nearest_open_location(*location), game_map)
+        self.game_map = game_map
 
     # Enemies take their turns
     def handle_enemy_turns(self) -> None:
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
-                entity.ai.perform()
+        self._pursuit_field = None  # The player has acted, so last turn's map is out of date
+        self.turn += 1
+        spread_scent(self.game_map, self.player.x, self.player.y, self.turn)
+        self.scheduler.play_turn(self)
 
     def update_fov(self) -> None:
-        """Recompute the visible area based on the players POV"""
-        self.game_map.visible[:] = compute_fov(
+        """
+        Recompute the visible area based on the players POV
+        Only the square the FOV radius can reach is looked at, and nothing is done if neither the player nor the
+        tiles have changed since last time, such as after a wait or a bump into a wall
+        """
+        game_map = self.game_map
+        x, y = self.player.x, self.player.y
+        fov_key = (game_map, game_map.version, x, y)
+        if fov_key == self._fov_key:
+            return
+        self._fov_key = fov_key
+
+        # Nothing past the FOV radius can be visible, so the FOV is computed on that square only
+        x1, y1 = max(x - FOV_RADIUS, 0), max(y - FOV_RADIUS, 0)
+        x2, y2 = min(x + FOV_RADIUS + 1, game_map.width), min(y + FOV_RADIUS + 1, game_map.height)
+        visible = compute_fov(
             # 2D numpy array, all non zero values area transparent. This is used to calculate FOV
-            self.game_map.tiles["transparent"],
+            game_map.tiles["transparent"][x1:x2, y1:y2],
 
-            # Origin point for the FOV (2D index)
-            (self.player.x, self.player.y),
+            # Origin point for the FOV (2D index), inside the square
+            (x - x1, y - y1),
 
             # How far the FOV extends
-            radius=8,
+            radius=FOV_RADIUS,
         )
 
-        # If a tile is "visible" it should be added to "explored"
-        # This line sets the explored array to include everything in the visible, plus what it had already
-        self.game_map.explored |= self.game_map.visible
+        # If a tile is "visible" it should be added to "explored", set_visible does both
+        game_map.set_visible(visible, (x1, y1, x2, y2))
 
     # Handles drawing to the screen, iterate though self.entities and print them
     def render(self, console: Console):
-        self.game_map.render(console)
+        self.camera.center_on(self.player.x, self.player.y, self.game_map.width, self.game_map.height)
+        profiler = self.profiler
+        start = perf_counter()
+        self.game_map.render(console, self.camera)
+        map_end = perf_counter()
 
         self.message_log.render(console=console, x=21, y=45, width=40, height=5)
+        if profiler:
+            profiler.record_frame(MAP_RENDER, map_end - start)
+            profiler.record_frame(MESSAGE_RENDER, perf_counter() - map_end)
 
         render_bar(
             console=console,
@@ -65,4 +179,10 @@ class Engine:
             total_width=20,
         )
 
+        if self.floors:
+            render_dungeon_level(console=console, dungeon_level=self.floors.depth, location=(0, 47))
+
         render_names_at_mouse_location(console=console, x=21, y=44, engine=self)
+
+        if profiler and profiler.overlay_visible:
+            render_perf_overlay(console, profiler)
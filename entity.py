@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-import copy
-from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING
+import gc
+from typing import Iterable, List, Optional, Tuple, Type, TypeVar, TYPE_CHECKING
 
+from entity_store import Column
 from render_order import RenderOrder
+from scheduler import NORMAL_SPEED
 
 if TYPE_CHECKING:
     from components.ai import BaseAI
     from components.fighter import Fighter
+    from entity_store import EntityStore
     from game_map import GameMap
 
 T = TypeVar("T", bound="Entity")
@@ -16,9 +19,36 @@ T = TypeVar("T", bound="Entity")
 class Entity:
     """
     Generic object to represent players, enemies, items...
+    x, y, blocks_movement and alive are copied into the EntityStore of the GameMap the entity is on, speed and energy
+    are stored in it
     """
+    # parent is only set once the entity is put on a map, until then hasattr(entity, "parent") is False
+    __slots__ = (
+        "parent",
+        "char",
+        "color",
+        "name",
+        "render_order",
+        "x",
+        "y",
+        "blocks_movement",
+        "alive",  # True for living actors
+        "_store",
+        "_row",
+        "_detached_speed",
+        "_detached_energy",
+    )
+
     parent: GameMap
 
+    # Energy gained each turn, and energy the entity has to spend on actions, see scheduler.py
+    speed = Column("speed")
+    energy = Column("energy")
+
+    # Row of the EntityStore holding this entity's values, _store is None when it isn't on a map
+    _store: Optional[EntityStore]
+    _row: int
+
     def __init__(
             self,
             parent: Optional[GameMap] = None,
@@ -31,6 +61,10 @@ class Entity:
             blocks_movement: bool = False,
             render_order: RenderOrder = RenderOrder.CORPSE
     ):
+        self._store = None
+        self.alive = False
+        self.speed = 0  # Only actors act
+        self.energy = 0
         self.x = x
         self.y = y
         # This is the character we use to represent the entity
@@ -42,38 +76,86 @@ class Entity:
         if parent:
             # If parent isn't provided now then it will be set later
             self.parent = parent
-            parent.entities.add(self)
+            parent.add_entity(self)
 
     @property
     def gamemap(self) -> GameMap:
         return self.parent.gamemap
 
-    def spawn(self: T, gamemap: GameMap, x: int, y: int):
+    def clone(self: T) -> T:
+        """
+        Return a new entity, not on any map, built from this one. Prototypes in entity_factories are spawned this way
+        The slots are filled in directly, which is much cheaper than a copy.deepcopy walking the whole object graph
+        """
+        clone = Entity.__new__(Entity)
+        self._copy_to(clone)
+        return clone  # type: ignore
+
+    def _copy_to(self, clone: Entity) -> None:
+        """Fill the slots of a new entity from this one, it starts detached at 0, 0"""
+        clone._store = None
+        clone.x = 0
+        clone.y = 0
+        clone.blocks_movement = self.blocks_movement
+        clone.alive = False
+        clone._detached_speed = self.speed
+        clone._detached_energy = 0
+        clone.char = self.char
+        clone.color = self.color
+        clone.name = self.name
+        clone.render_order = self.render_order
+
+    def spawn(self: T, gamemap: GameMap, x: int, y: int) -> T:
         """Spawn a copy of this instance at the given location"""
-        clone = copy.deepcopy(self)
+        clone = self.clone()
         clone.x = x
         clone.y = y
         clone.parent = gamemap
-        gamemap.entities.add(clone)
+        gamemap.add_entity(clone)
         return clone
 
+    def spawn_many(self: T, gamemap: GameMap, locations: Iterable[Tuple[int, int]]) -> List[T]:
+        """Spawn a copy of this instance at each of the given locations, much faster than calling spawn for each"""
+        # Every clone is part of a reference cycle (actor, fighter, AI), so creating many of them keeps triggering
+        # the cyclic garbage collector, which then walks all the clones made so far. It's paused until they're placed
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            clones = []
+            for x, y in locations:
+                clone = self.clone()
+                clone.x = x
+                clone.y = y
+                clone.parent = gamemap
+                clones.append(clone)
+            gamemap.add_entities(clones)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        return clones
+
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
         """Place this entity at a new location. Handles moving across GameMaps"""
         self.x = x
         self.y = y
         if gamemap:
             if hasattr(self, "parent"):  # Possibly uninitialized
-                self.gamemap.entities.remove(self)
+                self.gamemap.remove_entity(self)
             self.parent = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+        elif hasattr(self, "parent"):
+            self.gamemap.update_entity(self)
 
     def move(self, dx: int, dy: int) -> None:
         # Move the entity by a given amount
         self.x += dx
         self.y += dy
+        self.gamemap.update_entity(self)
 
 
 class Actor(Entity):
+    __slots__ = ("fighter", "_ai")
+
     def __init__(
             self,
             *,
@@ -83,7 +165,8 @@ class Actor(Entity):
             color: Tuple[int, int, int] = (255, 255, 255),
             name: str = "<Unnamed>",
             ai_cls: Type[BaseAI],
-            fighter: Fighter
+            fighter: Fighter,
+            speed: int = NORMAL_SPEED,
     ):
         super().__init__(
             x=x,
@@ -95,11 +178,33 @@ class Actor(Entity):
             render_order=RenderOrder.ACTOR,
         )
 
-        self.ai: Optional[BaseAI] = ai_cls(self)
+        self.speed = speed
+        self.ai = ai_cls(self)
 
         self.fighter = fighter
         self.fighter.parent = self
 
+    def clone(self) -> Actor:
+        """Return a new actor with a fresh AI of the same class and a copy of the fighter"""
+        clone = Actor.__new__(Actor)
+        self._copy_to(clone)
+        clone.fighter = self.fighter.clone(clone)
+        clone._ai = type(self.ai)(clone)
+        clone.alive = True  # What the ai setter would do
+        return clone
+
+    @property
+    def ai(self) -> Optional[BaseAI]:
+        return self._ai
+
+    @ai.setter
+    def ai(self, value: Optional[BaseAI]) -> None:
+        # Removing the AI is what kills an actor, the alive column follows it
+        self._ai = value
+        self.alive = value is not None
+        if self._store is not None:
+            self._store.alive[self._row] = self.alive
+
     @property
     def is_alive(self) -> bool:
         """Return True as long as this actor can perform actions"""
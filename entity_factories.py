@@ -1,3 +1,4 @@
+# Prototypes of the actors, new ones are made from them with Entity.spawn / spawn_many (or clone for the player)
 from components.ai import HostileEnemy
 from components.fighter import Fighter
 from entity import Actor
@@ -0,0 +1,160 @@
+"""
+Array backed storage for the entities on a GameMap
+
+Each entity on a map owns one row of the map's EntityStore. Its position, blocks_movement, whether it's a living
+actor, its speed and energy, and its Fighter's stats are kept in NumPy columns, so questions about many entities at
+once can be answered with array masks.
+The values the turn loop reads all the time (position, blocks_movement, alive and hp) stay plain attributes of the
+objects, which are much faster to read than a column, and their columns are copies. These are updated where the
+values change: GameMap.update_entity, which must be called after moving an entity anyway, and the ai and hp setters.
+The other values live in their column while the entity is on a map, through a Column attribute.
+Entities that aren't on a map, such as the prototypes in entity_factories, keep all their values on themselves.
+"""
+from __future__ import annotations
+
+from typing import Any, List, Optional, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+# Column name and type, for the columns belonging to the entity and to its fighter
+ENTITY_COLUMNS = [
+    ("x", np.int32), ("y", np.int32), ("blocks_movement", bool), ("alive", bool), ("speed", np.int32),
+    ("energy", np.int32),
+]
+FIGHTER_COLUMNS = [("hp", np.int32), ("max_hp", np.int32), ("power", np.int32), ("defense", np.int32)]
+
+# Columns that copy a plain attribute of their owner, and the name of that attribute
+MIRRORED_COLUMNS = {"x": "x", "y": "y", "blocks_movement": "blocks_movement", "alive": "alive", "hp": "_hp"}
+
+# The attribute of the owner each column is filled from when it is attached, and emptied into when it is detached
+ATTRIBUTES = {
+    column: MIRRORED_COLUMNS.get(column, f"_detached_{column}") for column, _ in ENTITY_COLUMNS + FIGHTER_COLUMNS
+}
+
+
+class Column:
+    """
+    Attribute stored in a column of an EntityStore while its owner is attached to one, for the unmirrored columns
+    The owner (an Entity or a Fighter) needs `_store` and `_row` attributes, `_store` being None while detached
+    """
+
+    def __init__(self, column: str):
+        self.column = column
+        self.detached = f"_detached_{column}"  # Where the value lives while the owner isn't in a store
+
+    def __get__(self, instance: Any, owner: Any = None) -> Any:
+        if instance is None:
+            return self
+        store = instance._store
+        if store is None:
+            return getattr(instance, self.detached)
+        return getattr(store, self.column).item(instance._row)
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        store = instance._store
+        if store is None:
+            setattr(instance, self.detached, value)
+        else:
+            getattr(store, self.column)[instance._row] = value
+
+
+class EntityStore:
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.size = 0  # Rows at or past this have never been used
+        self._free_rows: List[int] = []
+
+        self.entities: List[Optional[Entity]] = [None] * capacity  # The entity owning each row
+        self.in_use = np.zeros(capacity, dtype=bool)
+        for column, dtype in ENTITY_COLUMNS + FIGHTER_COLUMNS:
+            setattr(self, column, np.zeros(capacity, dtype=dtype))
+
+    def attach(self, entity: Entity) -> None:
+        """Give an entity a row, moving its values (and its fighter's) into the columns"""
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.size
+            self.size += 1
+
+        self.entities[row] = entity
+        self.in_use[row] = True
+        for owner, columns in self._owners(entity):
+            for column, _ in columns:
+                getattr(self, column)[row] = getattr(owner, ATTRIBUTES[column])
+            owner._store, owner._row = self, row
+
+    def attach_many(self, entities: List[Entity]) -> List[int]:
+        """Attach a batch of entities, filling the columns with one assignment each. Returns their rows"""
+        rows = [self._free_rows.pop() for _ in range(min(len(entities), len(self._free_rows)))]
+        new_rows = len(entities) - len(rows)
+        while self.size + new_rows > self.capacity:
+            self._grow()
+        rows.extend(range(self.size, self.size + new_rows))
+        self.size += new_rows
+
+        for entity, row in zip(entities, rows):
+            self.entities[row] = entity
+        self.in_use[rows] = True
+        # Entities with and without a fighter may be mixed, each group fills its own columns
+        for owners, columns in (
+            (entities, ENTITY_COLUMNS),
+            ([getattr(entity, "fighter", None) for entity in entities], FIGHTER_COLUMNS),
+        ):
+            owner_rows = [row for owner, row in zip(owners, rows) if owner is not None]
+            owners = [owner for owner in owners if owner is not None]
+            for column, _ in columns:
+                attribute = ATTRIBUTES[column]
+                getattr(self, column)[owner_rows] = [getattr(owner, attribute) for owner in owners]
+            for owner, row in zip(owners, owner_rows):
+                owner._store, owner._row = self, row
+        return rows
+
+    def detach(self, entity: Entity) -> None:
+        """Take the entity's row away, moving the values that live in the columns back onto it"""
+        row = entity._row
+        for owner, columns in self._owners(entity):
+            for column, _ in columns:
+                if column not in MIRRORED_COLUMNS:
+                    setattr(owner, ATTRIBUTES[column], getattr(self, column).item(row))
+            owner._store = None
+
+        self.entities[row] = None
+        self.in_use[row] = False
+        self.alive[row] = False  # Keeps free rows out of the living actor masks
+        self._free_rows.append(row)
+
+    def _owners(self, entity: Entity) -> List[Any]:
+        fighter = getattr(entity, "fighter", None)
+        if fighter is None:
+            return [(entity, ENTITY_COLUMNS)]
+        return [(entity, ENTITY_COLUMNS), (fighter, FIGHTER_COLUMNS)]
+
+    def _grow(self) -> None:
+        self.entities.extend([None] * self.capacity)
+        for column, _ in [("in_use", bool)] + ENTITY_COLUMNS + FIGHTER_COLUMNS:
+            old = getattr(self, column)
+            new = np.zeros(self.capacity * 2, dtype=old.dtype)
+            new[: self.capacity] = old
+            setattr(self, column, new)
+        self.capacity *= 2
+
+    def in_row_order(self) -> List[Entity]:
+        """
+        Return the attached entities by row, which is the order they were added in unless rows were freed
+        Rows break ties in the turn order, so maps rebuilt from these come out playing the same
+        """
+        return [entity for entity in self.entities[: self.size] if entity is not None]
+
+    def rows_of(self, entities: List[Entity]) -> np.ndarray:
+        """Return the rows of the given entities, which must be attached to this store"""
+        return np.array([entity._row for entity in entities], dtype=np.intp)
+
+    def living_actor_rows(self) -> np.ndarray:
+        """Return the rows of the living actors"""
+        return np.flatnonzero(self.alive[: self.size])
@@ -0,0 +1,98 @@
+"""
+The floors of the dungeon, below each other and joined by stairs
+
+Every floor is generated from its own seed, derived from the game's, so it comes out the same whenever and on
+whichever thread it is generated. In interactive games, once start_prefetching is called, the floor below the
+player's is generated on a background thread while they explore, so taking the stairs down doesn't have to wait
+for it. Headless runs and replays leave it off, and generate each floor when its stairs are taken.
+The floors the player left are kept as they were, explored tiles and monsters included, up to MAX_KEPT_FLOORS of
+them. Older ones are generated again if they are visited again, as they were first found.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import random
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+from procgen import generate_dungeon
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from game_map import GameMap
+    from setup_game import LevelParams
+
+# How many floors the player left are kept in memory
+MAX_KEPT_FLOORS = 4
+
+# One thread generates the next floor of every game, the GIL would keep a second one from going any faster
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="floors")
+
+
+def floor_seed(seed: int, depth: int) -> int:
+    """Return the seed floor `depth` is generated from. The first floor uses the game's seed itself"""
+    if depth == 1:
+        return seed
+    return random.Random(f"{seed}/{depth}").randrange(2 ** 32)
+
+
+class Floors:
+    """
+    seed is the game's seed, params how every floor is generated
+    depth is the number of the floor the player is on, counting down from 1
+    kept holds the floors the player left by their depth, the least recently left first
+    prefetching is whether the floor below the player's is generated in the background, see start_prefetching
+    """
+
+    def __init__(self, seed: int, params: LevelParams, max_kept: int = MAX_KEPT_FLOORS):
+        self.seed = seed
+        self.params = params
+        self.max_kept = max_kept
+        self.depth = 1
+        self.kept: Dict[int, GameMap] = {}
+        self.prefetching = False
+        self._next: Optional[Tuple[int, concurrent.futures.Future]] = None  # Floor being generated, and its depth
+
+    def generate(self, engine: Engine, depth: int) -> GameMap:
+        """Generate floor `depth`, without the player in it"""
+        return generate_dungeon(
+            **self.params._asdict(),
+            engine=engine,
+            rng=random.Random(floor_seed(self.seed, depth)),
+            place_player=False,
+            up_stairs=depth > 1,
+        )
+
+    def start_prefetching(self, engine: Engine) -> None:
+        """From now on generate the floor below the player's in the background, starting with the one below this"""
+        self.prefetching = True
+        self.prefetch(engine, self.depth + 1)
+
+    def prefetch(self, engine: Engine, depth: int) -> None:
+        """
+        Start generating floor `depth` on the background thread, unless it is kept or already being generated
+        Does nothing unless prefetching is turned on
+        """
+        if not self.prefetching or depth in self.kept or (self._next and self._next[0] == depth):
+            return
+        self._next = (depth, _executor.submit(self.generate, engine, depth))
+
+    def enter(self, engine: Engine, depth: int) -> GameMap:
+        """
+        Keep the engine's current floor and return floor `depth`, the new current one, without the player in it yet
+        The floor below it starts being generated
+        """
+        self.kept.pop(self.depth, None)
+        self.kept[self.depth] = engine.game_map
+        while len(self.kept) > self.max_kept:
+            del self.kept[next(iter(self.kept))]
+
+        game_map = self.kept.pop(depth, None)
+        if game_map is None:
+            if self._next and self._next[0] == depth:
+                game_map = self._next[1].result()  # Waits only if the player got here before it was done
+                self._next = None
+            else:
+                game_map = self.generate(engine, depth)
+        self.depth = depth
+        self.prefetch(engine, depth + 1)
+        return game_map
@@ -1,28 +1,66 @@
 from __future__ import annotations
 
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, TYPE_CHECKING
 
 import numpy as np  # type: ignore
 from tcod.console import Console
 
+from components.ai import NO_SCENT
 from entity import Actor
+from entity_store import EntityStore
 import tile_types
 
 if TYPE_CHECKING:
+    from camera import Camera
     from engine import Engine
     from entity import Entity
+    from procgen import RectangularRoom
+
+# Shared empty result for lookups on unoccupied cells
+_NO_ENTITIES: Set[Entity] = frozenset()  # type: ignore
 
 
 class GameMap:
     def __init__(
-            self, engine: Engine, width: int, height: int, entities: Iterable[Entity] = ()
+            self,
+            engine: Engine,
+            width: int,
+            height: int,
+            entities: Iterable[Entity] = (),
+            tiles: Optional[np.ndarray] = None,  # Use this tiles array, such as a memory map, instead of a new one
     ):
         self.engine = engine
         self.width, self.height = width, height
-        self.entities = set(entities)
+        self.entities: Set[Entity] = set()
+        self.store = EntityStore()  # Positions and stats of the entities, as arrays
 
         # Create a 2d array, filled with the same values. It Basically fills self.tiles with floor tiles
-        self.tiles = np.full((width, height), fill_value=tile_types.wall, order="F")
+        # Change tiles through set_tiles so the movement cost stays up to date
+        if tiles is None:
+            tiles = np.full(
+                (width, height), fill_value=tile_types.wall.view(tile_types.tile_raw_dt), order="F"
+            ).view(tile_types.tile_dt)
+        self.tiles = tiles
+        self.version = 0  # Goes up every time set_tiles changes the layout, so paths through old tiles can be dropped
+
+        # Number of movement blocking entities on each tile
+        self._blockers = np.zeros((width, height), dtype=np.int8, order="F")
+
+        # Cost of moving through each tile for the pathfinders, 0 means the tile can't be walked on
+        # It is kept up to date as tiles change and blocking entities move, so it never has to be rebuilt
+        self._cost = np.zeros((width, height), dtype=np.int8, order="F")
+        self._cost_view = self._cost.view()
+        self._cost_view.flags.writeable = False
+        self._update_cost(...)
+
+        # Spatial index of the entities, keyed by the cell they stand on
+        # _entity_locations remembers where, and if as a blocker, each entity was indexed so it can be found again
+        self._entities_by_location: Dict[Tuple[int, int], Set[Entity]] = {}
+        self._entity_locations: Dict[Entity, Tuple[Tuple[int, int], bool]] = {}
+        self._entity_changes = 0  # Goes up when an entity is added, removed, moved or dies
+
+        for entity in entities:
+            self.add_entity(entity)
 
         self.visible = np.full(
             (width, height), fill_value=False, order="F"
@@ -32,70 +70,304 @@ class GameMap:
             (width, height), fill_value=False, order="F"
         )  # Tiles the player has seen before
 
+        # Turn the player's scent was laid on each tile, less its distance from the player, see ai.spread_scent
+        self.scent = np.full((width, height), fill_value=NO_SCENT, dtype=np.int32, order="F")
+
+        self.rooms: List[RectangularRoom] = []  # Rooms procgen dug out of this map, in the order they were made
+        # Where the stairs are, set by locate_stairs once the map is built
+        self.downstairs_location: Optional[Tuple[int, int]] = None
+        self.upstairs_location: Optional[Tuple[int, int]] = None
+
+        # Tile graphics of the whole map as last composited by render, in the console's layout. Only the cells in
+        # the dirty rectangle (x1, y1, x2, y2, end exclusive) are out of date
+        self._graphics: Optional[np.ndarray] = None
+        self._dirty: Optional[Tuple[int, int, int, int]] = (0, 0, width, height)
+        # Rectangle every visible tile is inside, set_visible narrows it down from the whole map
+        self._visible_bounds = (0, 0, width, height)
+        self._visible_changes = 0
+        # Entities render drew last time, as (x, y, char, color) in console coordinates, and what they depend on
+        self._drawn_entities: List[Tuple[int, int, str, Tuple[int, int, int]]] = []
+        self._drawn_entities_key: Optional[Tuple[int, int, int, int]] = None
+
     @property
     def gamemap(self) -> GameMap:
         return self
 
+    @property
+    def cost(self) -> np.ndarray:
+        """
+        Read only array of the cost of moving through each tile, 0 means the tile can't be walked on
+        A blocking entity adds 10 to the cost of its tile
+        A lower number means more enemies will crowd behind each other in hallways
+        A higher number means enemies will take longer paths in order to surround the player
+        """
+        return self._cost_view
+
+    def set_tiles(self, index, tile: np.ndarray) -> None:
+        """Set the tiles at `index` (anything that can index self.tiles) to `tile`"""
+        self.tiles.view(tile_types.tile_raw_dt)[index] = tile.view(tile_types.tile_raw_dt)
+        self._update_cost(index)
+        self.version += 1
+        self.mark_dirty(0, 0, self.width, self.height)  # Tiles are only set in bulk, while the level is built
+
+    def locate_stairs(self) -> None:
+        """Find the stairs, procgen digs them in the centers of the last and the first room"""
+        raw_tiles = self.tiles.view(tile_types.tile_raw_dt)
+        self.downstairs_location = self.upstairs_location = None
+        for location in {room.center for room in self.rooms[:1] + self.rooms[-1:]}:
+            if raw_tiles[location] == tile_types.down_stairs.view(tile_types.tile_raw_dt):
+                self.downstairs_location = location
+            elif raw_tiles[location] == tile_types.up_stairs.view(tile_types.tile_raw_dt):
+                self.upstairs_location = location
+
+    def set_visible(self, visible: np.ndarray, bounds: Tuple[int, int, int, int]) -> None:
+        """
+        Make the tiles in `visible` the visible ones, and add them to the explored ones
+        `visible` covers the rectangle `bounds` (x1, y1, x2, y2, end exclusive), every tile outside it isn't visible
+        """
+        # Only the tiles that were visible and those that now are can change, the rest of the map isn't touched
+        old_x1, old_y1, old_x2, old_y2 = self._visible_bounds
+        self.visible[old_x1:old_x2, old_y1:old_y2] = False
+        self.mark_dirty(old_x1, old_y1, old_x2, old_y2)
+
+        x1, y1, x2, y2 = bounds
+        self.visible[x1:x2, y1:y2] = visible
+        self.explored[x1:x2, y1:y2] |= visible
+        self.mark_dirty(x1, y1, x2, y2)
+
+        self._visible_bounds = bounds
+        self._visible_changes += 1
+
+    def mark_dirty(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """Have render composite the tiles from x1, y1 to x2, y2 (end exclusive) again"""
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2, self.width), min(y2, self.height)
+        if x1 >= x2 or y1 >= y2:
+            return
+        if self._dirty is not None:
+            old_x1, old_y1, old_x2, old_y2 = self._dirty
+            x1, y1, x2, y2 = min(x1, old_x1), min(y1, old_y1), max(x2, old_x2), max(y2, old_y2)
+        self._dirty = x1, y1, x2, y2
+
+    def _update_cost(self, index) -> None:
+        self._cost[index] = np.where(self.tiles["walkable"][index], 1 + 10 * self._blockers[index], 0)
+
+    def _update_cost_at(self, location: Tuple[int, int]) -> None:
+        # Faster version of _update_cost for a single tile, np.where is slow on single values
+        self._cost[location] = 1 + 10 * int(self._blockers[location]) if self.tiles[location]["walkable"] else 0
+
     @property
     def actors(self) -> Iterator[Actor]:
         """Iterate over this maps living actors"""
-        yield from (
-            entity
-            for entity in self.entities
-            if isinstance(entity, Actor) and entity.is_alive
-        )
+        entities = self.store.entities
+        yield from [entities[row] for row in self.store.living_actor_rows()]  # type: ignore
+
+    def actors_in(self, mask: np.ndarray) -> List[Actor]:
+        """Return the living actors standing on the tiles that are True in `mask`"""
+        store = self.store
+        rows = store.living_actor_rows()
+        rows = rows[mask[store.x[rows], store.y[rows]]]
+        return [store.entities[row] for row in rows]  # type: ignore
+
+    def actors_in_fov(self) -> List[Actor]:
+        """Return the living actors the player can see"""
+        return self.actors_in(self.visible)
+
+    def add_entity(self, entity: Entity) -> None:
+        """Add an entity to this map and index it at its current location"""
+        if entity not in self.entities:
+            self.entities.add(entity)
+            self.store.attach(entity)
+            self._entity_changes += 1
+        self.update_entity(entity)
+
+    def add_entities(self, entities: Iterable[Entity]) -> None:
+        """Add many entities to this map at once, indexing them in bulk instead of one update_entity call each"""
+        new_entities = []
+        for entity in entities:
+            if entity in self.entities:
+                self.update_entity(entity)
+            else:
+                new_entities.append(entity)
+        self.entities.update(new_entities)
+        self._entity_changes += 1
+        store = self.store
+        rows = np.asarray(store.attach_many(new_entities), dtype=np.intp)
+
+        xs, ys, blocks = store.x[rows], store.y[rows], store.blocks_movement[rows]
+        by_location = self._entities_by_location
+        for entity, x, y, blocks_movement in zip(new_entities, xs.tolist(), ys.tolist(), blocks.tolist()):
+            location = x, y
+            self._entity_locations[entity] = location, blocks_movement
+            cell = by_location.get(location)
+            if cell is None:
+                by_location[location] = {entity}
+            else:
+                cell.add(entity)
+
+        blocked = xs[blocks], ys[blocks]
+        np.add.at(self._blockers, blocked, 1)  # add.at counts entities sharing a tile
+        self._update_cost(blocked)
+
+    def remove_entity(self, entity: Entity) -> None:
+        """Remove an entity from this map and from the spatial index"""
+        if entity not in self.entities:
+            return
+        self.entities.remove(entity)
+        self._entity_changes += 1
+        indexed = self._entity_locations.pop(entity, None)
+        if indexed is not None:
+            self._unindex(entity, *indexed)
+        self.store.detach(entity)
+
+    def update_entity(self, entity: Entity) -> None:
+        """
+        Move an entity to the cell it now stands on in the spatial index and update the movement cost
+        This must be called whenever the entity's x, y or blocks_movement changes, it copies them into the store too
+        """
+        indexed = (entity.x, entity.y), entity.blocks_movement
+        old_indexed = self._entity_locations.get(entity)
+        if old_indexed == indexed:
+            return
+        self._entity_changes += 1
+        if old_indexed is not None:
+            self._unindex(entity, *old_indexed)
+
+        location, blocks_movement = self._entity_locations[entity] = indexed
+        store = entity._store
+        if store is not None:
+            row = entity._row
+            store.x[row], store.y[row] = location
+            store.blocks_movement[row] = blocks_movement
+        self._entities_by_location.setdefault(location, set()).add(entity)
+        if blocks_movement:
+            self._blockers[location] += 1
+            self._update_cost_at(location)
+
+    def _unindex(self, entity: Entity, location: Tuple[int, int], blocks_movement: bool) -> None:
+        cell = self._entities_by_location[location]
+        cell.discard(entity)
+        if not cell:
+            # Drop empty cells so the index only grows with the number of occupied cells
+            del self._entities_by_location[location]
+        if blocks_movement:
+            self._blockers[location] -= 1
+            self._update_cost_at(location)
+
+    def get_entities_at_location(self, x: int, y: int) -> Set[Entity]:
+        """Return the entities standing at x, y. The returned set must not be modified"""
+        return self._entities_by_location.get((x, y), _NO_ENTITIES)
+
+    def get_entities_in_rect(self, x1: int, y1: int, x2: int, y2: int) -> List[Entity]:
+        """Return the entities inside the rectangle from x1, y1 to x2, y2 (both corners included)"""
+        found: List[Entity] = []
+        if (x2 - x1 + 1) * (y2 - y1 + 1) <= len(self._entities_by_location):
+            # Small area, look at each cell
+            for x in range(x1, x2 + 1):
+                for y in range(y1, y2 + 1):
+                    found.extend(self._entities_by_location.get((x, y), ()))
+        else:
+            # Large area, it's cheaper to look at each occupied cell
+            for (x, y), cell in self._entities_by_location.items():
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    found.extend(cell)
+        return found
+
+    def get_entities_in_radius(self, x: int, y: int, radius: int) -> List[Entity]:
+        """Return the entities within `radius` tiles of x, y (Chebyshev distance, so a square area)"""
+        return self.get_entities_in_rect(x - radius, y - radius, x + radius, y + radius)
 
     def get_blocking_entity_at_location(
             self, location_x: int, location_y: int
     ) -> Optional[Entity]:
-        for entity in self.entities:
-            if (
-                    entity.blocks_movement
-                    and entity.x == location_x
-                    and entity.y == location_y
-            ):
+        for entity in self.get_entities_at_location(location_x, location_y):
+            if entity.blocks_movement:
                 # If entity is found that blocks movement and occupies location_x and location_y, it returns that Entity
                 return entity
 
         return None
 
     def ger_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+        for entity in self.get_entities_at_location(x, y):
+            if isinstance(entity, Actor) and entity.is_alive:
+                return entity
 
         return None
 
     # Makes sure the player doesn't leave the map
+    def nearest_open_location(self, x: int, y: int) -> Tuple[int, int]:
+        """Return the walkable tile nearest to x, y that no blocking entity stands on, x, y itself if it is open"""
+        for radius in range(max(self.width, self.height)):
+            x1, y1 = max(x - radius, 0), max(y - radius, 0)
+            # Walkable and unblocked is a cost of exactly 1
+            open_tiles = np.argwhere(self._cost[x1:x + radius + 1, y1:y + radius + 1] == 1) + (x1, y1)
+            if len(open_tiles):
+                nearest = open_tiles[np.argmin(((open_tiles - (x, y)) ** 2).sum(axis=1))]
+                return int(nearest[0]), int(nearest[1])
+        raise ValueError("The map has no open tile")
+
     def in_bounds(self, x: int, y: int) -> bool:
         """Return true if x and y are inside of the bounds of this map"""
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def render(self, console: Console) -> None:
+    def render(self, console: Console, camera: Camera) -> None:
         """
-        Renders the map
+        Renders the part of the map inside the camera's viewport
 
         If a tile is in the "visible" array, then draw it with the "light" colors
         If it isn't, but it's in the "explored" array, then draw it with the "dark" colors
         Otherwise, the default is "SHROUD"
+        The graphics are kept from one frame to the next, only the tiles marked dirty are composited again
         """
-        console.tiles_rgb[0: self.width, 0: self.height] = np.select(
-            # This line will check if the tile is either visible, then explored
-            condlist=[self.visible, self.explored],
-            # If visible, use "light", if explored use "dark"
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
-            # If neither use "SHROUD"
-            default=tile_types.SHROUD
-        )
+        graphics = self._graphics
+        if graphics is None or graphics.dtype != console.rgb.dtype:
+            graphics = self._graphics = np.zeros((self.width, self.height), dtype=console.rgb.dtype, order="F")
+            self._dirty = (0, 0, self.width, self.height)
+
+        if self._dirty is not None:
+            x1, y1, x2, y2 = self._dirty
+            area = slice(x1, x2), slice(y1, y2)
+            tiles = self.tiles[area]
+            graphics[area] = np.select(
+                # This line will check if the tile is either visible, then explored
+                condlist=[self.visible[area], self.explored[area]],
+                # If visible, use "light", if explored use "dark"
+                choicelist=[tiles["light"], tiles["dark"]],
+                # If neither use "SHROUD"
+                default=tile_types.SHROUD
+            )
+            self._dirty = None
+
+        view = camera.map_slices(self.width, self.height)
+        raw_dt = np.dtype((np.void, graphics.dtype.itemsize))  # Copied as raw bytes, like tiles in set_tiles
+        width, height = view[0].stop - view[0].start, view[1].stop - view[1].start
+        console.rgb.view(raw_dt)[0:width, 0:height] = graphics.view(raw_dt)[view]
+
+        key = (self._entity_changes, self._visible_changes, camera.x, camera.y)
+        if key != self._drawn_entities_key:
+            self._drawn_entities = self._entities_to_draw(camera, view)
+            self._drawn_entities_key = key
+
+        for x, y, char, fg in self._drawn_entities:
+            console.print(x=x, y=y, string=char, fg=fg)
+
+    def _entities_to_draw(
+            self, camera: Camera, view: Tuple[slice, slice]
+    ) -> List[Tuple[int, int, str, Tuple[int, int, int]]]:
+        # Only entities in FOV are drawn, so only the visible part of the viewport needs looking at
+        x1, y1, x2, y2 = self._visible_bounds
+        x1, y1 = max(x1, view[0].start), max(y1, view[1].start)
+        x2, y2 = min(x2, view[0].stop), min(y2, view[1].stop)
 
         # Tells sorted to sort by the value of render_order
         entities_sorted_for_rendering = sorted(
-            self.entities, key=lambda x: x.render_order.value
+            self.get_entities_in_rect(x1, y1, x2 - 1, y2 - 1), key=lambda x: x.render_order.value
         )
 
+        drawn = []
         for entity in entities_sorted_for_rendering:
             # Only print enemies that are in FOV
             if self.visible[entity.x, entity.y]:
-                console.print(
-                    x=entity.x, y=entity.y, string=entity.char, fg=entity.color
-                )
+                x, y = camera.map_to_screen(entity.x, entity.y)
+                drawn.append((x, y, entity.char, entity.color))
+        return drawn
@@ -0,0 +1,117 @@
+"""
+Run games without a window or any events, driving the player with a scripted policy
+
+Useful for soak testing and profiling on machines without a display, e.g.
+`python headless.py --games 100 --turns 1000 --policy hunter`
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+
+from actions import Action, BumpAction, WaitAction
+from components.ai import DIRECTIONS
+from engine import Engine
+from profiler import Profiler
+import setup_game
+
+# A policy picks the players next action, like the keyboard does in MainGameEventHandler
+PlayerPolicy = Callable[[Engine], Action]
+
+
+def wait_policy(engine: Engine) -> Action:
+    """Never move, let the monsters come"""
+    return WaitAction(engine.player)
+
+
+def random_walk_policy(engine: Engine) -> Action:
+    """Bump in a random direction, attacking anything that's in the way"""
+    dx, dy = random.choice(DIRECTIONS)
+    return BumpAction(engine.player, dx, dy)
+
+
+def hunter_policy(engine: Engine) -> Action:
+    """Walk towards the closest monster in view and attack it, otherwise walk randomly"""
+    player = engine.player
+    targets = [actor for actor in engine.game_map.actors_in_fov() if actor is not player]
+    if not targets:
+        return random_walk_policy(engine)
+
+    target = min(targets, key=lambda actor: max(abs(actor.x - player.x), abs(actor.y - player.y)))
+    dx = (target.x > player.x) - (target.x < player.x)
+    dy = (target.y > player.y) - (target.y < player.y)
+    return BumpAction(player, dx, dy)
+
+
+POLICIES: Dict[str, PlayerPolicy] = {
+    "wait": wait_policy,
+    "random": random_walk_policy,
+    "hunter": hunter_policy,
+}
+
+
+class GameResult(NamedTuple):
+    seed: int
+    turns: int  # Turns played before the player died or max_turns was reached
+    seconds: float
+    player_alive: bool
+
+
+def run_game(policy: PlayerPolicy, seed: int, max_turns: int, profiler: Optional[Profiler] = None) -> GameResult:
+    """
+    Play a new game with `seed` until the player dies or `max_turns` turns are played
+    With a `profiler` its turns are timed
+    """
+    engine = setup_game.new_game(seed)
+    engine.profiler = profiler
+    player = engine.player
+
+    turns = 0
+    start = time.perf_counter()
+    while turns < max_turns and player.is_alive:
+        engine.play_turn(policy(engine))
+        turns += 1
+
+    return GameResult(seed, turns, time.perf_counter() - start, player.is_alive)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play games headlessly and report turns per second")
+    parser.add_argument("--games", type=int, default=10, help="number of games to play")
+    parser.add_argument("--turns", type=int, default=1000, help="maximum turns per game")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, the rest count up from it")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random", help="how the player picks actions")
+    parser.add_argument(
+        "--profile", metavar="PATH", help="time every turn and save the latest timings to PATH, as CSV if it ends "
+                                          "with .csv and JSON otherwise"
+    )
+    args = parser.parse_args()
+    profiler = Profiler() if args.profile else None
+
+    total_turns = 0
+    total_seconds = 0.0
+    deaths = 0
+    for seed in range(args.seed, args.seed + args.games):
+        result = run_game(POLICIES[args.policy], seed, args.turns, profiler)
+        total_turns += result.turns
+        total_seconds += result.seconds
+        deaths += not result.player_alive
+        print(
+            f"seed {result.seed}: {result.turns} turns, {result.turns / result.seconds:,.0f} turns/s, "
+            f"{'alive' if result.player_alive else 'died'}"
+        )
+
+    print(
+        f"{args.games} games, {total_turns} turns, {deaths} deaths, "
+        f"{total_turns / total_seconds:,.0f} turns/s"
+    )
+    if profiler:
+        for phase, percentiles in profiler.summary()["turn"].items():
+            print(f"{phase:<12} p50 {percentiles['p50']:7.3f} ms  p99 {percentiles['p99']:7.3f} ms")
+        profiler.export(args.profile)
+
+
+if __name__ == "__main__":
+    main()
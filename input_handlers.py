@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-from typing import Optional, TYPE_CHECKING
+from typing import Iterable, List, Optional, TYPE_CHECKING
 
 import tcod.event
 
-from actions import Action, BumpAction, EscapeAction, WaitAction
+from actions import Action, BumpAction, EscapeAction, TakeStairsAction, WaitAction
+from profiler import Profiler
 
 if TYPE_CHECKING:
     from engine import Engine
+    from message_log import HistoryIndex
 
 MOVE_KEYS = {
     # Arrow keys.
@@ -46,18 +48,63 @@ WAIT_KEYS = {
 }
 
 
+def coalesce_events(events: Iterable[tcod.event.Event]) -> List[tcod.event.Event]:
+    """
+    Return the events of a batch worth handling
+    Only the last mouse motion is kept, where the mouse ended up. A key repeating while the game was busy counts once,
+    so holding it down doesn't queue up moves. Letter keys, like the vi keys, are each followed by their text input,
+    which doesn't break the repeat and is dropped along with it
+    """
+    events = list(events)
+    last_motion = max((i for i, event in enumerate(events) if isinstance(event, tcod.event.MouseMotion)), default=-1)
+    coalesced: List[tcod.event.Event] = []
+    last_key: Optional[int] = None  # Key of the last KeyDown kept, until an event other than text or the mouse
+    dropped_key = False  # Whether the event before was a dropped repeat, whose text input comes next
+    for i, event in enumerate(events):
+        after_dropped_key, dropped_key = dropped_key, False
+        if isinstance(event, tcod.event.MouseMotion):
+            if i != last_motion:
+                continue
+        elif isinstance(event, tcod.event.TextInput):
+            if after_dropped_key:
+                continue
+        elif isinstance(event, tcod.event.KeyDown):
+            if event.repeat and event.sym == last_key:
+                dropped_key = True
+                continue
+            last_key = event.sym
+        else:
+            last_key = None
+        coalesced.append(event)
+    return coalesced
+
+
 class EventHandler(tcod.event.EventDispatch[Action]):
     def __init__(self, engine: Engine):
         self.engine = engine
 
     def handle_events(self, context: tcod.context.Context) -> None:
-        for event in tcod.event.wait():
+        """Wait for events and handle them, the ones made pointless by a later one are dropped"""
+        for event in coalesce_events(tcod.event.wait()):
             context.convert_event(event)
-            self.dispatch(event)
+            # Through the engine, as an event can switch handlers and the rest of the batch goes to the new one
+            self.engine.event_handler.handle_event(event)
+
+    def handle_event(self, event: tcod.event.Event) -> None:
+        self.dispatch(event)
 
     def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
-        if self.engine.game_map.in_bounds(event.tile.x, event.tile.y):
-            self.engine.mouse_location = event.tile.x, event.tile.y
+        engine = self.engine
+        location = event.tile.x, event.tile.y
+        if location == engine.mouse_location:
+            return
+        camera = engine.camera
+        if camera.screen_to_map(*location) != camera.screen_to_map(*engine.mouse_location):
+            engine.dirty = True  # The names under the mouse change
+        engine.mouse_location = location
+
+    def ev_windowexposed(self, event: tcod.event.WindowEvent) -> None:
+        self.engine.dirty = True  # The window has to be drawn again
 
     def ev_quit(self, event: tcod.event.Quit) -> Optional[Action]:
         raise SystemExit()
@@ -67,28 +114,36 @@ class EventHandler(tcod.event.EventDispatch[Action]):
 
 
 class MainGameEventHandler(EventHandler):
-    def handle_events(self, context: tcod.context.Context) -> None:
-        for event in tcod.event.wait():
-            context.convert_event(event)
+    def handle_event(self, event: tcod.event.Event) -> None:
+        action = self.dispatch(event)
 
-            action = self.dispatch(event)
+        if action is None:
+            return
 
-            if action is None:
-                continue
+        if self.engine.recorder and not isinstance(action, EscapeAction):
+            self.engine.recorder.record(action)  # Before the turn, so an action that crashes the game is recorded too
+        self.engine.play_turn(action)
+        self.engine.dirty = True
 
-            action.perform()
-
-            self.engine.handle_enemy_turns()
-            self.engine.update_fov()  # Update the FOV before the players next action
+        if self.engine.autosaver:
+            self.engine.autosaver.on_turn(self.engine)
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[Action]:
         action: Optional[Action] = None
 
         key = event.sym
+        modifier = event.mod
 
         player = self.engine.player
 
-        if key in MOVE_KEYS:
+        # > and < are shifted . and , on most keyboards, . alone waits
+        if key == tcod.event.K_PERIOD and modifier & (tcod.event.KMOD_LSHIFT | tcod.event.KMOD_RSHIFT):
+            action = TakeStairsAction(player, down=True)
+
+        elif key == tcod.event.K_COMMA and modifier & (tcod.event.KMOD_LSHIFT | tcod.event.KMOD_RSHIFT):
+            action = TakeStairsAction(player, down=False)
+
+        elif key in MOVE_KEYS:
             dx, dy = MOVE_KEYS[key]
             action = BumpAction(player, dx, dy)
 
@@ -101,19 +156,25 @@ class MainGameEventHandler(EventHandler):
         elif key == tcod.event.K_v:
             self.engine.event_handler = HistoryViewer(self.engine)
 
+        elif key == tcod.event.K_F3:
+            # Show or hide the timings, they are recorded from the first time it is shown
+            if self.engine.profiler is None:
+                self.engine.profiler = Profiler()
+            self.engine.profiler.overlay_visible = not self.engine.profiler.overlay_visible
+            self.engine.dirty = True
+
         # No valid key was pressed
         return action
 
 
 class GameOverEventHandler(EventHandler):
-    def handle_events(self, context: tcod.context.Context) -> None:
-        for event in tcod.event.wait():
-            action = self.dispatch(event)
+    def handle_event(self, event: tcod.event.Event) -> None:
+        action = self.dispatch(event)
 
-            if action is None:
-                continue
+        if action is None:
+            return
 
-            action.perform()
+        action.perform()
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[Action]:
         action: Optional[Action] = None
@@ -137,51 +198,97 @@ CURSOR_Y_KEYS = {
 
 
 class HistoryViewer(EventHandler):
-    """Print the history on a larger window which can be navigated"""
+    """
+    Print the history on a larger window which can be navigated
+    The history is drawn through a HistoryIndex, so a frame only reads the messages on screen however long it is.
+    Press / to search it: type the text then Enter, n jumps to the next (older) match
+    """
 
     def __init__(self, engine: Engine):
         super().__init__(engine)
-        self.log_length = len(engine.message_log.messages)
-        self.cursor = self.log_length - 1
+        self.log_console: Optional[tcod.console.Console] = None  # Made on the first frame then reused
+        self.index: Optional[HistoryIndex] = None  # Needs the console's width, fetched on the first frame
+        self.cursor = 0  # The wrapped line at the bottom of the window
+        self.query: Optional[str] = None  # Text being typed while searching
+        self.last_query = ""
+        self.skip_text = False  # The / starting a search also comes as text input, which isn't part of the query
 
     def on_render(self, console: tcod.Console) -> None:
         super().on_render(console)  # Draw the main state as the background.
 
-        log_console = tcod.Console(console.width - 6, console.height - 6)
+        log_console = self.log_console
+        if log_console is None or (log_console.width, log_console.height) != (console.width - 6, console.height - 6):
+            log_console = self.log_console = tcod.console.Console(console.width - 6, console.height - 6)
+            self.index = self.engine.message_log.history_index(log_console.width - 2)
+            self.cursor = self.index.line_count - 1
+        log_console.clear()
 
         # Draw a frame with a custom banner title.
         log_console.draw_frame(0, 0, log_console.width, log_console.height)
+        title = "┤Message history├" if self.query is None else f"┤Search: {self.query}├"
         log_console.print_box(
-            0, 0, log_console.width, 1, "┤Message history├", alignment=tcod.CENTER
+            0, 0, log_console.width, 1, title, alignment=tcod.CENTER
         )
 
         # Render the message log using the cursor parameter.
-        self.engine.message_log.render_messages(
-            log_console,
-            1,
-            1,
-            log_console.width - 2,
-            log_console.height - 2,
-            self.engine.message_log.messages[: self.cursor + 1],
-        )
+        assert self.index
+        self.index.render(log_console, 1, 1, log_console.height - 2, self.cursor)
         log_console.blit(console, 3, 3)
 
+    def search(self, query: str, again: bool = False) -> None:
+        """
+        Move the cursor to the last line of the latest message containing `query`, from the one at the cursor back
+        With `again` the message at the cursor is skipped, it's the match the last search found
+        """
+        if not query or not self.index:
+            return
+        self.last_query = query
+        message, _ = self.index.locate(self.cursor)
+        found = self.engine.message_log.find(query, before=message if again else message + 1)
+        if found is not None and found >= self.index.start:
+            self.cursor = self.index.first_line(found + 1) - 1
+
+    def ev_textinput(self, event: tcod.event.TextInput) -> None:
+        if self.skip_text:
+            self.skip_text = False
+        elif self.query is not None:
+            self.query += event.text
+            self.engine.dirty = True
+
     def ev_keydown(self, event: tcod.event.KeyDown) -> None:
+        if self.index is None:
+            return  # Not drawn yet
+        self.engine.dirty = True  # The cursor or the search moves
+        line_count = self.index.line_count
+
+        if self.query is not None:  # Typing a search, letters come as text input
+            if event.sym in (tcod.event.K_RETURN, tcod.event.K_KP_ENTER):
+                self.search(self.query)
+                self.query = None
+            elif event.sym == tcod.event.K_BACKSPACE:
+                self.query = self.query[:-1]
+            elif event.sym == tcod.event.K_ESCAPE:
+                self.query = None
+        elif event.sym == tcod.event.K_SLASH:
+            self.query = ""
+            self.skip_text = True
+        elif event.sym == tcod.event.K_n:
+            self.search(self.last_query, again=True)
         # Fancy conditional movement to make it feel right.
-        if event.sym in CURSOR_Y_KEYS:
+        elif event.sym in CURSOR_Y_KEYS:
             adjust = CURSOR_Y_KEYS[event.sym]
             if adjust < 0 and self.cursor == 0:
                 # Only move from the top to the bottom when you're on the edge.
-                self.cursor = self.log_length - 1
-            elif adjust > 0 and self.cursor == self.log_length - 1:
+                self.cursor = line_count - 1
+            elif adjust > 0 and self.cursor == line_count - 1:
                 # Same with bottom to top movement.
                 self.cursor = 0
             else:
                 # Otherwise move while staying clamped to the bounds of the history log.
-                self.cursor = max(0, min(self.cursor + adjust, self.log_length - 1))
+                self.cursor = max(0, min(self.cursor + adjust, line_count - 1))
         elif event.sym == tcod.event.K_HOME:
-            self.cursor = 0  # Move directly to the top message.
+            self.cursor = 0  # Move directly to the top line.
         elif event.sym == tcod.event.K_END:
-            self.cursor = self.log_length - 1  # Move directly to the last message.
+            self.cursor = line_count - 1  # Move directly to the last line.
         else:  # Any other key moves back to the main game state.
             self.engine.event_handler = MainGameEventHandler(self.engine)
@@ -0,0 +1,139 @@
+"""
+On-disk cache of generated levels, keyed by seed and generation parameters
+
+Each entry is a directory holding the tiles as a .npy file, which is loaded as a memory map, and a small
+JSON manifest of the rooms and entities. Entries are stamped with the layout of tile_types.tile_dt,
+so entries written before the tile layout changed are dropped instead of loaded.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import entity_factories
+from entity import Actor
+from game_map import GameMap
+from procgen import RectangularRoom
+import setup_game
+import tile_types
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+# Bump this when the way entries are written changes
+CACHE_FORMAT_VERSION = 3
+
+# Changes whenever the tile layout or the cache format changes
+CACHE_STAMP = hashlib.sha1(
+    f"{CACHE_FORMAT_VERSION}:{tile_types.tile_dt.descr}".encode()
+).hexdigest()
+
+# Prototypes that can be rebuilt from a manifest, by entity name
+PROTOTYPES: Dict[str, Actor] = {
+    prototype.name: prototype for prototype in (entity_factories.orc, entity_factories.troll)
+}
+
+
+class LevelCache:
+    def __init__(self, directory: str = ".level_cache", max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes  # Least recently used entries are removed when the cache gets bigger than this
+
+    @staticmethod
+    def key(seed: int, params: setup_game.LevelParams) -> str:
+        return hashlib.sha1(repr((seed, tuple(params))).encode()).hexdigest()
+
+    def load_or_generate(self, engine: Engine, seed: int, params: setup_game.LevelParams) -> GameMap:
+        """Return the level for `seed` from the cache, generating and storing it if it isn't there"""
+        game_map = self.load(engine, seed, params)
+        if game_map is None:
+            game_map = setup_game.generate_level(engine, seed, params)
+            self.store(seed, params, game_map)
+        return game_map
+
+    def load(self, engine: Engine, seed: int, params: setup_game.LevelParams) -> Optional[GameMap]:
+        """Return the cached level for `seed` with the engine's player placed in it, or None if it isn't cached"""
+        entry = os.path.join(self.directory, self.key(seed, params))
+        try:
+            with open(os.path.join(entry, "manifest.json")) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if manifest.get("stamp") != CACHE_STAMP:
+            shutil.rmtree(entry, ignore_errors=True)  # Written for an older tile layout
+            return None
+
+        try:
+            # Copy on write, so the game can change its tiles without changing the cache
+            tiles = np.load(os.path.join(entry, "tiles.npy"), mmap_mode="c")
+            os.utime(os.path.join(entry, "manifest.json"))  # Mark as recently used
+        except (OSError, ValueError):
+            shutil.rmtree(entry, ignore_errors=True)  # Missing, truncated or removed by someone else, stored again
+            return None
+
+        game_map = GameMap(engine, params.map_width, params.map_height, tiles=tiles)
+        game_map.rooms.extend(RectangularRoom(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in manifest["rooms"])
+        game_map.locate_stairs()
+        engine.player.place(*manifest["player"], game_map)
+        for name, x, y in manifest["entities"]:
+            PROTOTYPES[name].spawn(game_map, x, y)
+        return game_map
+
+    def store(self, seed: int, params: setup_game.LevelParams, game_map: GameMap) -> None:
+        """Add a freshly generated level to the cache"""
+        player = game_map.engine.player
+        manifest: Dict[str, Any] = {
+            "stamp": CACHE_STAMP,
+            "seed": seed,
+            "params": params._asdict(),
+            "rooms": [[room.x1, room.y1, room.x2, room.y2] for room in game_map.rooms],
+            "player": [player.x, player.y],
+            "entities": [
+                [entity.name, entity.x, entity.y]
+                # In row order, so the entities are spawned again into the same rows
+                for entity in game_map.store.in_row_order()
+                if entity is not player and entity.name in PROTOTYPES
+            ],
+        }
+
+        entry = os.path.join(self.directory, self.key(seed, params))
+        temp_entry = f"{entry}.tmp{os.getpid()}"
+        os.makedirs(temp_entry, exist_ok=True)
+        np.save(os.path.join(temp_entry, "tiles.npy"), game_map.tiles)
+        with open(os.path.join(temp_entry, "manifest.json"), "w") as file:
+            json.dump(manifest, file)
+
+        # Entries appear all at once, so a half written entry is never loaded
+        try:
+            os.rename(temp_entry, entry)
+        except OSError:
+            shutil.rmtree(temp_entry, ignore_errors=True)  # Another process stored it first
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total_bytes = 0
+        for name in os.listdir(self.directory):
+            if ".tmp" in name:
+                continue  # Still being written by store, it's no entry yet
+            entry = os.path.join(self.directory, name)
+            try:
+                size = sum(os.path.getsize(os.path.join(entry, file)) for file in os.listdir(entry))
+                last_used = os.path.getmtime(os.path.join(entry, "manifest.json"))
+            except OSError:
+                continue  # Being written or removed by someone else
+            entries.append((last_used, size, entry))
+            total_bytes += size
+
+        for last_used, size, entry in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_bytes -= size
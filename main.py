@@ -1,69 +1,116 @@
-import copy
+import argparse
+import concurrent.futures
+import os
+import random
+from time import perf_counter
+from typing import Optional
 
 import tcod
 
-import color
+from camera import SCREEN_HEIGHT, SCREEN_WIDTH
 from engine import Engine
-import entity_factories
-from procgen import generate_dungeon
-
-
-def main() -> None:
-    screen_width = 80
-    screen_height = 50
-
-    map_width = 80
-    map_height = 43
-
-    room_max_size = 10
-    room_min_size = 6
-    # Max rooms a floor can have
-    max_rooms = 30
-
-    max_monsters_per_room = 2
-
-    # Loads the file set
-    tileset = tcod.tileset.load_tilesheet(
+from level_cache import LevelCache
+from profiler import PRESENT, Profiler
+import save_game
+import setup_game
+
+SAVE_PATH = "savegame.sav"
+HISTORY_PATH = "message_history.txt"  # Messages too old to be kept in memory end up here
+
+
+def load_or_new_game(seed: Optional[int] = None) -> Engine:
+    """Continue the saved game if there is one with the player still alive, otherwise start a new one"""
+    if seed is None and os.path.exists(SAVE_PATH):
+        try:
+            engine = save_game.load_game(SAVE_PATH)
+        except (OSError, ValueError, KeyError, save_game.SaveError) as exc:
+            print(f"Couldn't load {SAVE_PATH}, starting a new game: {exc!r}")
+        else:
+            if engine.player.is_alive:
+                return engine
+
+    if os.path.exists(HISTORY_PATH):
+        os.remove(HISTORY_PATH)  # It belongs to the previous game
+    # Dungeons that were played before are loaded from the level cache instead of being generated again
+    return setup_game.new_game(seed, level_cache=LevelCache())
+
+
+def load_tileset() -> tcod.tileset.Tileset:
+    """Loads the file set"""
+    return tcod.tileset.load_tilesheet(
         "dejavu10x10_gs_tc.png", 32, 8, tcod.tileset.CHARMAP_TCOD
     )
 
-    player = copy.deepcopy(entity_factories.player)
-
-    engine = Engine(player=player)
 
-    engine.game_map = generate_dungeon(
-        max_rooms=max_rooms,
-        room_min_size=room_min_size,
-        room_max_size=room_max_size,
-        map_width=map_width,
-        map_height=map_height,
-        max_monsters_per_room=max_monsters_per_room,
-        engine=engine,
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Michael's roguelike")
+    parser.add_argument("--seed", type=int, help="start a new game on the dungeon generated from this seed")
+    parser.add_argument(
+        "--profile", metavar="PATH", help="time every turn and frame, and save the latest timings to PATH on exit, "
+                                          "as CSV if it ends with .csv and JSON otherwise. F3 shows them in game"
     )
+    parser.add_argument(
+        "--record", metavar="PATH", help="start a new game and record every action to PATH, "
+                                         "for replay.py to play it again"
+    )
+    args = parser.parse_args()
 
-    engine.update_fov()
+    seed = args.seed
+    if args.record and seed is None:
+        seed = random.randrange(2 ** 32)  # A recording is replayed from the seed, so the game needs a known one
 
-    engine.message_log.add_message(
-        "Hello and welcome, to the adventure zone!", color.welcome_text
-    )
+    # The save is loaded, or the first level generated, on another thread while the window is being created
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="startup")
+    loading = executor.submit(load_or_new_game, seed)
+    executor.shutdown(wait=False)
 
     # Creates the screen
     with tcod.context.new_terminal(
-            screen_width,
-            screen_height,
-            tileset=tileset,
+            SCREEN_WIDTH,
+            SCREEN_HEIGHT,
+            tileset=load_tileset(),
             title="Michael's roguelike",
             vsync=True,
     ) as context:
+        engine = loading.result()
+        if args.record:
+            from replay import ActionRecorder  # Only needed when recording
+
+            engine.recorder = ActionRecorder(args.record, seed)
+        engine.autosaver = save_game.Autosaver(SAVE_PATH)
+        if engine.floors:
+            engine.floors.start_prefetching(engine)  # While the player explores, not worth it for headless games
+        engine.message_log.spill_path = HISTORY_PATH
+        if args.profile:
+            engine.profiler = Profiler()
+
         # Creates our console which we draw to
-        root_console = tcod.Console(screen_width, screen_height, order="F")
-        # Game loop
-        while True:
-            root_console.clear()
-            engine.event_handler.on_render(console=root_console)
-            context.present(root_console)
-
-            engine.event_handler.handle_events(context)
+        root_console = tcod.Console(SCREEN_WIDTH, SCREEN_HEIGHT, order="F")
+        # Game loop, a frame is only drawn when something on screen changed
+        try:
+            while True:
+                if engine.dirty:
+                    root_console.clear()
+                    engine.event_handler.on_render(console=root_console)
+                    start = perf_counter()
+                    context.present(root_console)
+                    engine.dirty = False
+                    if engine.profiler:
+                        engine.profiler.record_frame(PRESENT, perf_counter() - start)
+                        engine.profiler.end_frame()
+
+                engine.event_handler.handle_events(context)
+        except SystemExit:  # Save on the way out, unless the player died
+            engine.autosaver.close()
+            if engine.recorder:
+                engine.recorder.close()
+            if args.profile and engine.profiler:
+                engine.profiler.export(args.profile)
+            if engine.player.is_alive:
+                save_game.save_game(engine, SAVE_PATH)
+            elif os.path.exists(SAVE_PATH):
+                os.remove(SAVE_PATH)
+            raise
 
 
 if __name__ == "__main__":
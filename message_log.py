@@ -1,19 +1,29 @@
-from typing import Iterable, List, Reversible, Tuple
+from array import array
+import bisect
+import itertools
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Reversible, Tuple
 import textwrap
 
 import tcod
 
 import color
 
+# How many messages a MessageLog keeps in memory by default, older ones are spilled to its spill file
+MAX_MESSAGES = 1000
+
 
 # Used to save and display messages in our log
 class Message:
+    __slots__ = ("plain_text", "fg", "count", "_wrapped_key", "_wrapped")
+
     def __init__(self, text: str, fg: Tuple[int, int, int]):
         self.plain_text = text  # The actual message text.
         self.fg = fg  # The “foreground” color of the message
         self.count = 1  # This is used to display something like “The Orc attacks (x3).” Rather than crowding our
         # message log with the same message over and over, we can “stack” the messages by increasing a message’s
         # count. This only happens when the same message appears several times in a row.
+        self._wrapped_key: Optional[Tuple[int, int]] = None  # Width and count _wrapped was made for
+        self._wrapped: List[str] = []
 
     @property
     def full_text(self) -> str:
@@ -22,10 +32,40 @@ class Message:
             return f"{self.plain_text} (x{self.count})"
         return self.plain_text
 
+    def wrapped(self, width: int) -> List[str]:
+        """Return the full text wrapped to `width`, the lines are kept until the width or the count changes"""
+        key = width, self.count
+        if key != self._wrapped_key:
+            self._wrapped = list(MessageLog.wrap(self.full_text, width))
+            self._wrapped_key = key
+        return self._wrapped
+
 
 class MessageLog:
-    def __init__(self) -> None:
+    """
+    messages holds the latest messages, at most max_messages of them
+    Older messages are appended to the text file at spill_path, one per line, or dropped if it is None.
+    spilled counts them
+    The whole history is numbered from the first message ever added, len() of the log is the number of messages in it.
+    The ones that can still be read with message_at start at history_start
+    """
+
+    def __init__(self, max_messages: int = MAX_MESSAGES, spill_path: Optional[str] = None) -> None:
         self.messages: List[Message] = []  # Keeps a list of the Messages received
+        self.max_messages = max_messages
+        self.spill_path = spill_path
+        self.spilled = 0
+        self._spill_offsets = array("q")  # Byte offset in the spill file of each message written to it
+        self._spill_reader: Optional[BinaryIO] = None
+        self._history_index: Optional["HistoryIndex"] = None
+
+    def __len__(self) -> int:
+        return self.spilled + len(self.messages)
+
+    @property
+    def history_start(self) -> int:
+        """Number of the oldest message still available, the ones before it were dropped without a spill file"""
+        return self.spilled - len(self._spill_offsets)
 
     def add_message(
             self, text: str, fg: Tuple[int, int, int] = color.white, *, stack: bool = True,
@@ -38,6 +78,83 @@ class MessageLog:
             self.messages[-1].count += 1
         else:
             self.messages.append(Message(text, fg))
+            if len(self.messages) > self.max_messages:
+                self.spill()
+
+    def spill(self) -> None:
+        """Move the oldest messages out of memory, a quarter of max_messages at a time so it doesn't happen often"""
+        count = len(self.messages) - self.max_messages + self.max_messages // 4
+        if self.spill_path:
+            with open(self.spill_path, "ab") as file:
+                offset = file.seek(0, 2)
+                for message in self.messages[:count]:
+                    line = f"{message.full_text.replace(chr(10), ' ')}\n".encode()  # One line per message
+                    file.write(line)
+                    self._spill_offsets.append(offset)
+                    offset += len(line)
+        else:
+            self._spill_offsets = array("q")  # Earlier spilled messages can't be told apart from dropped ones
+        del self.messages[:count]
+        self.spilled += count
+
+    def message_at(self, index: int) -> Message:
+        """
+        Return message `index` of the whole history
+        Messages read back from the spill file are new Message objects, in the default color
+        """
+        if index >= self.spilled:
+            return self.messages[index - self.spilled]
+        reader = self._open_spill_file()
+        reader.seek(self._spill_offsets[index - self.history_start])
+        return Message(reader.readline().decode().rstrip("\n"), color.white)
+
+    def iter_texts(self, start: int) -> Iterator[str]:
+        """Yield the full text of every message from `start` on, reading the spill file in one go"""
+        if start < self.spilled:
+            reader = self._open_spill_file()
+            reader.seek(self._spill_offsets[start - self.history_start])
+            for line in itertools.islice(reader, self.spilled - start):
+                yield line.decode().rstrip("\n")
+            start = self.spilled
+        for message in self.messages[start - self.spilled:]:
+            yield message.full_text
+
+    def find(self, query: str, before: int) -> Optional[int]:
+        """Return the number of the latest message before `before` containing `query`, ignoring case"""
+        query = query.lower()
+        for index in range(min(before, len(self)) - 1, self.spilled - 1, -1):
+            if query in self.messages[index - self.spilled].full_text.lower():
+                return index
+
+        end = min(before, self.spilled) - self.history_start  # Spilled messages to look through
+        if end <= 0:
+            return None
+        # Search the spill file's bytes backwards, rather than decoding it line by line
+        reader = self._open_spill_file()
+        reader.seek(self._spill_offsets[0])
+        end_offset = self._spill_offsets[end] if end < len(self._spill_offsets) else None
+        contents = reader.read(-1 if end_offset is None else end_offset - self._spill_offsets[0]).lower()
+        found = contents.rfind(query.encode())
+        if found < 0:
+            return None
+        # The message is the one whose line starts at or before the match
+        found_line = bisect.bisect_right(self._spill_offsets, self._spill_offsets[0] + found) - 1
+        return self.history_start + found_line
+
+    def history_index(self, width: int) -> "HistoryIndex":
+        """Return the HistoryIndex of this log for `width`, kept between calls and brought up to date"""
+        index = self._history_index
+        if index is None or index.width != width or index.start != self.history_start:
+            index = self._history_index = HistoryIndex(self, width)
+        else:
+            index.refresh()
+        return index
+
+    def _open_spill_file(self) -> BinaryIO:
+        if self._spill_reader is None or self._spill_reader.name != self.spill_path:
+            assert self.spill_path
+            self._spill_reader = open(self.spill_path, "rb")
+        return self._spill_reader
 
     def render(
             self, console: tcod.Console, x: int, y: int, width: int, height: int,
@@ -70,13 +187,89 @@ class MessageLog:
         """
         Render the messages provided
         The `messages` are rendered starting at the last message and working backwards
+        Only the messages that fit are looked at, and their wrapped lines are cached on them
         """
         y_offset = height - 1
 
         for message in reversed(messages):
-            print(message.full_text)
-            for line in reversed(list(cls.wrap(message.full_text, width))):  # This is throwing an error
+            for line in reversed(message.wrapped(width)):
+                console.print(x=x, y=y + y_offset, string=line, fg=message.fg)
+                y_offset -= 1
+                if y_offset < 0:
+                    return  # No more space to print messages
+
+
+class HistoryIndex:
+    """
+    Where each message of a MessageLog's history starts once wrapped to `width`, so the history can be drawn from any
+    line without wrapping the messages before it
+    The lines are numbered from the first line of the message at the log's history_start
+    """
+
+    def __init__(self, log: MessageLog, width: int):
+        self.log = log
+        self.width = width
+        self.start = log.history_start
+        # Entry i is the first line of message start + i, the last entry is the total number of lines
+        self._line_starts = array("q", [0])
+        self.refresh()
+
+    @property
+    def line_count(self) -> int:
+        return self._line_starts[-1]
+
+    def refresh(self) -> None:
+        """Index the messages added since the last refresh"""
+        if len(self._line_starts) > 1:
+            self._line_starts.pop()  # The last message may have been stacked since, so it's counted again
+        line = self._line_starts[-1]
+        for text in self.log.iter_texts(self.start + len(self._line_starts) - 1):
+            line += self._wrapped_line_count(text)
+            self._line_starts.append(line)
+
+    def locate(self, line: int) -> Tuple[int, int]:
+        """Return the number of the message holding `line`, and which of its lines it is"""
+        position = bisect.bisect_right(self._line_starts, line) - 1
+        return self.start + position, line - self._line_starts[position]
+
+    def first_line(self, message: int) -> int:
+        """Return the first line of a message"""
+        return self._line_starts[message - self.start]
+
+    def _wrapped_line_count(self, text: str) -> int:
+        width = self.width
+        if not text or "\n" in text or "\t" in text or "-" in text or "  " in text or text != text.strip():
+            return sum(1 for _ in MessageLog.wrap(text, width))  # Left to textwrap
+        # Most messages fit on one line, which can be told without wrapping them
+        if len(text) <= width:
+            return 1
+        # Words separated by single spaces, which wrap the same as textwrap does as long as none is too long for a line
+        lines = 1
+        line_length = -1
+        for word_length in map(len, text.split(" ")):
+            if word_length > width:
+                return sum(1 for _ in MessageLog.wrap(text, width))
+            line_length += 1 + word_length
+            if line_length > width:
+                lines += 1
+                line_length = word_length
+        return lines
+
+    def render(self, console: tcod.Console, x: int, y: int, height: int, bottom_line: int) -> None:
+        """Draw the `height` lines ending with `bottom_line` at x, y. Only the messages on screen are read"""
+        if self.line_count == 0:
+            return
+        message_number, line_in_message = self.locate(bottom_line)
+        # Of the bottom message, the lines after bottom_line aren't drawn. All the lines of the ones above it are
+        lines_shown: Optional[int] = line_in_message + 1
+        y_offset = height - 1
+        while message_number >= self.start:
+            message = self.log.message_at(message_number)
+            lines = message.wrapped(self.width)
+            for line in reversed(lines[:lines_shown]):
                 console.print(x=x, y=y + y_offset, string=line, fg=message.fg)
                 y_offset -= 1
                 if y_offset < 0:
                     return  # No more space to print messages
+            message_number -= 1
+            lines_shown = None
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 import random
-from typing import Iterator, List, Tuple, TYPE_CHECKING
+from typing import Optional, Tuple, TYPE_CHECKING
 
-import tcod
+import numpy as np  # type: ignore
 
 import entity_factories
 from game_map import GameMap
@@ -14,6 +14,8 @@ if TYPE_CHECKING:
 
 
 class RectangularRoom:
+    __slots__ = ("x1", "y1", "x2", "y2")
+
     # Takes coordinates of the top left corner and computes the bottom right
     def __init__(self, x: int, y: int, width: int, height: int):
         self.x1 = x
@@ -39,8 +41,16 @@ class RectangularRoom:
         # The function has +1s because if the rooms are next to each other
         # there needs to be an extra space for the wall
 
+    @property
+    def outer(self) -> Tuple[slice, slice]:
+        """Return the whole area of this room, walls included, as a 2D array index"""
+        return slice(self.x1, self.x2 + 1), slice(self.y1, self.y2 + 1)
+
     def intersects(self, other: RectangularRoom) -> bool:
-        """Returns true if this room overlaps with another Rectangular room"""
+        """
+        Returns true if this room overlaps with another Rectangular room
+        Overlapping means their `outer` areas share a tile
+        """
         return (
                 self.x1 <= other.x2
                 and self.x2 >= other.x1
@@ -50,43 +60,55 @@ class RectangularRoom:
 
 
 def place_entities(
-        room: RectangularRoom, dungeon: GameMap, maximum_monsters: int,
+        room: RectangularRoom, dungeon: GameMap, maximum_monsters: int, rng: Optional[random.Random] = None,
 ) -> None:
-    number_of_monsters = random.randint(0, maximum_monsters)
+    """Place up to `maximum_monsters` monsters in the room, `rng` defaults to the random module"""
+    if rng is None:
+        rng = random  # type: ignore  # The random module has the same functions as a Random instance
+
+    number_of_monsters = rng.randint(0, maximum_monsters)
 
     for i in range(number_of_monsters):
         # Select a random x and y for the entity
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
+        x = rng.randint(room.x1 + 1, room.x2 - 1)
+        y = rng.randint(room.y1 + 1, room.y2 - 1)
 
         # Make sure an entity isn't already there
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
+        if not dungeon.get_entities_at_location(x, y):
             # 80% chance for an Orc
-            if random.random() < 0.8:
+            if rng.random() < 0.8:
                 entity_factories.orc.spawn(dungeon, x, y)
             else:
                 entity_factories.troll.spawn(dungeon, x, y)
 
 
-# The method takes two arguments (two tuples of two integers) and returns an iterator or a Tuple of two ints
 def tunnel_between(
-        start: Tuple[int, int], end: Tuple[int, int]
-) -> Iterator[Tuple[int, int]]:
-    """Return an L-shaped tunnel between these two points"""
+        start: Tuple[int, int], end: Tuple[int, int], rng: Optional[random.Random] = None,
+) -> Tuple[Tuple[slice, slice], Tuple[slice, slice]]:
+    """
+    Return an L-shaped tunnel between these two points
+    The tunnel is returned as two straight lines, each one a 2D array index
+    `rng` defaults to the random module
+    """
+    if rng is None:
+        rng = random  # type: ignore
+
     x1, y1 = start
     x2, y2 = end
-    if random.random() < 0.5:  # 50% chance
+    if rng.random() < 0.5:  # 50% chance
         # Move horizontally and then vertically
         corner_x, corner_y = x2, y1
     else:
         # Move vertically and then horizontally
         corner_x, corner_y = x1, y2
 
-    # Generate the coordinates for this tunnel
-    for x, y in tcod.los.bresenham((x1, y1), (corner_x, corner_y)).tolist():
-        yield x, y
-    for x, y in tcod.los.bresenham((corner_x, corner_y), (x2, y2)).tolist():
-        yield x, y
+    return line_between((x1, y1), (corner_x, corner_y)), line_between((corner_x, corner_y), (x2, y2))
+
+
+def line_between(start: Tuple[int, int], end: Tuple[int, int]) -> Tuple[slice, slice]:
+    """Return a horizontal or vertical line between these two points, both included, as a 2D array index"""
+    (x1, y1), (x2, y2) = start, end
+    return slice(min(x1, x2), max(x1, x2) + 1), slice(min(y1, y2), max(y1, y2) + 1)
 
 
 def generate_dungeon(
@@ -97,48 +119,71 @@ def generate_dungeon(
         map_height: int,  # Height of the GameMap
         max_monsters_per_room: int,  # Max amount of monsters per room
         engine: Engine,
+        rng: Optional[random.Random] = None,  # Random number generator to use, defaults to the random module
+        place_player: bool = True,  # False leaves the player where it is, for floors generated ahead of time
+        up_stairs: bool = False,  # Whether the first room has stairs up, every floor but the first does
 ) -> GameMap:
-    """Generate a new dungeon map"""
+    """
+    Generate a new dungeon map
+    Pass each thread or process its own `rng` to generate dungeons in parallel
+    """
+    if rng is None:
+        rng = random  # type: ignore
+
     player = engine.player
-    dungeon = GameMap(engine, map_width, map_height, entities=[player])
+    dungeon = GameMap(engine, map_width, map_height, entities=[player] if place_player else ())
 
     # Running list of all rooms
-    rooms: List[RectangularRoom] = []
+    rooms = dungeon.rooms
+
+    # Rooms and tunnels are dug out in this mask, then copied to the tiles all at once at the end
+    floor_mask = np.zeros((map_width, map_height), dtype=bool, order="F")
+    # Area taken by the rooms, including their walls. A new room intersects another one if it touches this
+    claimed_mask = np.zeros((map_width, map_height), dtype=bool, order="F")
 
     # Iterate from 0 to max_rooms - 1
     # We dont know how many rooms this will generate, but we know it cant exceed an amount
     for r in range(max_rooms):
         # Get a random size for the room
-        room_width = random.randint(room_min_size, room_max_size)
-        room_height = random.randint(room_min_size, room_max_size)
+        room_width = rng.randint(room_min_size, room_max_size)
+        room_height = rng.randint(room_min_size, room_max_size)
 
         # Get a random pair of x and y coord to try and place the room
-        x = random.randint(0, dungeon.width - room_width - 1)
-        y = random.randint(0, dungeon.height - room_height - 1)
+        x = rng.randint(0, dungeon.width - room_width - 1)
+        y = rng.randint(0, dungeon.height - room_height - 1)
 
         # "RectangularRoom" class makes rectangles easier to work with
         new_room = RectangularRoom(x, y, room_width, room_height)
 
-        # Go through the other rooms and see if they intersect with this one
-        if any(new_room.intersects(other_room) for other_room in rooms):
+        # See if any of the other rooms intersect with this one
+        if claimed_mask[new_room.outer].any():
             continue  # This room intersects, go to the next attempt (we get rid of this one)
         # If there are no intersections this room is valid
+        claimed_mask[new_room.outer] = True
 
         # Dig out this rooms inner area
-        dungeon.tiles[new_room.inner] = tile_types.floor
+        floor_mask[new_room.inner] = True
 
         if len(rooms) == 0:
             # This is the first room, where the player starts
-            player.place(*new_room.center, dungeon)
+            if place_player:
+                player.place(*new_room.center, dungeon)
         else:  # All rooms after the first one
             # Dig a tunnel between this room and the one before it
-            for x, y, in tunnel_between(rooms[-1].center, new_room.center):
-                dungeon.tiles[x, y] = tile_types.floor
+            for line in tunnel_between(rooms[-1].center, new_room.center, rng):
+                floor_mask[line] = True
 
         # Puts the entities in their places
-        place_entities(new_room, dungeon, max_monsters_per_room)
+        place_entities(new_room, dungeon, max_monsters_per_room, rng)
 
         # Finally, append the new room to the list
         rooms.append(new_room)
 
+    dungeon.set_tiles(floor_mask, tile_types.floor)
+    if len(rooms) > 1:
+        dungeon.set_tiles(rooms[-1].center, tile_types.down_stairs)
+    if up_stairs:
+        dungeon.set_tiles(rooms[0].center, tile_types.up_stairs)
+    dungeon.locate_stairs()
+
     return dungeon
@@ -0,0 +1,137 @@
+"""
+Optional timing of the phases of every turn and every frame
+
+Engine.profiler is None unless profiling was asked for, the timed code only checks that. When it is set, the time
+spent in each phase is added up with record() and end_turn() or end_frame() stores the totals as one row of a fixed
+size ring buffer, so only the latest turns and frames are kept however long the game runs.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from typing import Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+# Phases of a turn
+ACTION = 0  # The player's action
+ENEMY_TURNS = 1  # Engine.handle_enemy_turns, AI included
+AI = 2  # All the monsters' AI.perform calls of the turn
+AI_MAX = 3  # The slowest single AI.perform of the turn
+UPDATE_FOV = 4
+TURN_PHASES = ("action", "enemy_turns", "ai", "ai_max", "update_fov")
+
+# Phases of a frame
+MAP_RENDER = 0
+MESSAGE_RENDER = 1
+PRESENT = 2  # context.present, the frame reaching the window
+FRAME_PHASES = ("map_render", "message_render", "present")
+
+# How many of the latest turns, and of the latest frames, are kept
+CAPACITY = 1024
+
+
+class TimingRing:
+    """The latest `capacity` rows of seconds spent in each of `phases`"""
+
+    def __init__(self, phases: Tuple[str, ...], capacity: int = CAPACITY):
+        self.phases = phases
+        self.rows = np.zeros((capacity, len(phases)), dtype=np.float64)
+        self.count = 0  # Rows ever stored, the latest is at (count - 1) % capacity
+        self.current = [0.0] * len(phases)  # The row being added up
+
+    def end_row(self) -> None:
+        self.rows[self.count % len(self.rows)] = self.current
+        self.count += 1
+        self.current = [0.0] * len(self.phases)
+
+    def latest(self) -> np.ndarray:
+        """Return the rows kept, oldest first"""
+        capacity = len(self.rows)
+        if self.count <= capacity:
+            return self.rows[: self.count]
+        return np.roll(self.rows, -(self.count % capacity), axis=0)
+
+    def percentiles(self, *percentiles: float) -> Dict[str, List[float]]:
+        """Return the given percentiles of each phase over the rows kept, in milliseconds"""
+        rows = self.latest()
+        if not len(rows):
+            return {phase: [0.0] * len(percentiles) for phase in self.phases}
+        values = np.percentile(rows, percentiles, axis=0) * 1000
+        return {phase: values[:, i].tolist() for i, phase in enumerate(self.phases)}
+
+
+class Profiler:
+    """
+    turns and frames hold the timings, the first row kept is turn or frame number count - len(rows)
+    overlay_visible is whether the p50/p99 overlay is drawn over the game
+    """
+
+    def __init__(self, capacity: int = CAPACITY):
+        self.turns = TimingRing(TURN_PHASES, capacity)
+        self.frames = TimingRing(FRAME_PHASES, capacity)
+        self.overlay_visible = False
+
+    def record_turn(self, phase: int, seconds: float) -> None:
+        self.turns.current[phase] += seconds
+
+    def record_ai(self, seconds: float) -> None:
+        current = self.turns.current
+        current[AI] += seconds
+        if seconds > current[AI_MAX]:
+            current[AI_MAX] = seconds
+
+    def record_frame(self, phase: int, seconds: float) -> None:
+        self.frames.current[phase] += seconds
+
+    def end_turn(self) -> None:
+        self.turns.end_row()
+
+    def end_frame(self) -> None:
+        self.frames.end_row()
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Return the p50 and p99 of every phase in milliseconds, by turn and frame phases"""
+        return {
+            kind: {phase: {"p50": p50, "p99": p99} for phase, (p50, p99) in ring.percentiles(50, 99).items()}
+            for kind, ring in (("turn", self.turns), ("frame", self.frames))
+        }
+
+    def export(self, path: str) -> None:
+        """Write the timings kept to `path`, as CSV if it ends with .csv and as JSON otherwise"""
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+    def export_json(self, path: str) -> None:
+        data = {"summary_ms": self.summary()}
+        for kind, ring in (("turns", self.turns), ("frames", self.frames)):
+            data[kind] = {
+                "first": ring.count - len(ring.latest()),
+                "phases": list(ring.phases),
+                "seconds": ring.latest().tolist(),
+            }
+        with open(path, "w") as file:
+            json.dump(data, file, indent=1)
+
+    def export_csv(self, path: str) -> None:
+        """One row per turn and per frame: kind, number, then the seconds of each phase, blank if not of that kind"""
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["kind", "number", *TURN_PHASES, *FRAME_PHASES])
+            for kind, ring in (("turn", self.turns), ("frame", self.frames)):
+                rows = ring.latest()
+                first = ring.count - len(rows)
+                for number, row in enumerate(rows.tolist(), first):
+                    seconds = row + [""] * len(FRAME_PHASES) if kind == "turn" else [""] * len(TURN_PHASES) + row
+                    writer.writerow([kind, number, *seconds])
+
+    def overlay_lines(self) -> List[str]:
+        """Return the lines of the overlay: p50 and p99 of every phase, in milliseconds"""
+        lines = [f"{'phase':<15}{'p50':>7}{'p99':>7}"]
+        for ring in (self.turns, self.frames):
+            for phase, (p50, p99) in ring.percentiles(50, 99).items():
+                lines.append(f"{phase:<15}{p50:>7.2f}{p99:>7.2f}")
+        lines.append(f"{self.turns.count} turns, {self.frames.count} frames")
+        return lines
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import Tuple, TYPE_CHECKING
 
 import color
 
@@ -8,6 +8,7 @@ if TYPE_CHECKING:
     from tcod import Console
     from engine import Engine
     from game_map import GameMap
+    from profiler import Profiler
 
 
 def get_names_at_location(x: int, y: int, game_map: GameMap) -> str:
@@ -19,7 +20,7 @@ def get_names_at_location(x: int, y: int, game_map: GameMap) -> str:
         return ""
 
     names = ", ".join(
-        entity.name for entity in game_map.entities if entity.x == x and entity.y == y
+        entity.name for entity in game_map.get_entities_at_location(x, y)
     )
 
     return names.capitalize()
@@ -46,6 +47,13 @@ def render_bar(
     )
 
 
+def render_dungeon_level(console: Console, dungeon_level: int, location: Tuple[int, int]) -> None:
+    """Render the level the player is currently on, at the given location"""
+    x, y = location
+
+    console.print(x=x, y=y, string=f"Dungeon level: {dungeon_level}")
+
+
 def render_names_at_mouse_location(
         console: Console, x: int, y: int, engine: Engine
 ) -> None:
@@ -54,10 +62,23 @@ def render_names_at_mouse_location(
     get_names_at_location, which we can assume for the moment will return the list of entity names we want. Once we
     have these entity names as a string, we can print that string to the given x and y location on the screen,
     with console.print. """
-    mouse_x, mouse_y = engine.mouse_location
+    # The mouse is on the console, the camera tells which part of the map is under it this frame
+    location = engine.camera.screen_to_map(*engine.mouse_location)
+    if location is None:
+        return  # Over the HUD
 
     names_at_mouse_location = get_names_at_location(
-        x=mouse_x, y=mouse_y, game_map=engine.game_map
+        x=location[0], y=location[1], game_map=engine.game_map
     )
 
-    console.print(x=x, y=y, string=names_at_mouse_location)
\ No newline at end of file
+    console.print(x=x, y=y, string=names_at_mouse_location)
+
+
+def render_perf_overlay(console: Console, profiler: Profiler) -> None:
+    """Draws the p50 and p99 time of every phase of the latest turns and frames in a box at the top right"""
+    lines = profiler.overlay_lines()
+    width = max(len(line) for line in lines) + 2
+    x = console.width - width
+    console.draw_frame(x, 0, width, len(lines) + 2, title="Perf (ms)", fg=color.white, bg=color.black)
+    for y, line in enumerate(lines, 1):
+        console.print(x=x + 1, y=y, string=line, fg=color.white)
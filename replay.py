@@ -0,0 +1,164 @@
+"""
+Recording the player's actions, and replaying them headlessly as fast as possible
+
+A recording is the MAGIC bytes, the format version and the seed of the game, then one byte per action the player
+took, appended as they are taken. Everything else in a game follows from the seed, so replaying the actions on
+new_game(seed) plays the exact same game again, also when the recorded game's level came from the level cache, which
+gives back levels exactly as they were generated. That makes any real session a repeatable performance trace, e.g.
+`python replay.py session.rec --render-every 10 --profile timings.json`
+"""
+from __future__ import annotations
+
+import argparse
+import struct
+import time
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Type, TYPE_CHECKING
+
+from tcod.console import Console
+
+from actions import Action, BumpAction, TakeStairsAction, WaitAction
+from camera import SCREEN_HEIGHT, SCREEN_WIDTH
+import headless
+from profiler import Profiler
+import setup_game
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from entity import Actor
+
+MAGIC = b"RLREC"
+HEADER = struct.Struct("<BQ")  # Format version, seed
+
+# Bump this when the action codes change, older recordings are then refused instead of replayed wrong
+RECORDING_FORMAT_VERSION = 1
+
+# An action with a direction is its code plus the direction's index in this list. Unlike components.ai.DIRECTIONS it
+# holds 0, 0, and its order is part of the recording format
+DIRECTIONS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+# Code of each action type that can be recorded, and how to rebuild it from the code and the player
+WAIT = 0
+BUMP = 16
+STAIRS = 32  # Plus 1 for the stairs up
+ACTION_CODES: Dict[Type[Action], int] = {WaitAction: WAIT, BumpAction: BUMP, TakeStairsAction: STAIRS}
+DECODERS: Dict[int, Callable[[Actor, int], Action]] = {
+    WAIT: lambda player, _: WaitAction(player),
+    BUMP: lambda player, direction: BumpAction(player, *DIRECTIONS[direction]),
+    STAIRS: lambda player, up: TakeStairsAction(player, down=not up),
+}
+
+
+class RecordingError(Exception):
+    """The file isn't a recording this version can replay"""
+
+
+def encode_action(action: Action) -> int:
+    """Return the byte an action is recorded as"""
+    code = ACTION_CODES.get(type(action))
+    if code is None:
+        raise ValueError(f"{type(action).__name__} can't be recorded")
+    if isinstance(action, BumpAction):
+        code += DIRECTIONS.index((action.dx, action.dy))
+    elif isinstance(action, TakeStairsAction):
+        code += not action.down
+    return code
+
+
+def decode_action(code: int, player: Actor) -> Action:
+    """Return the action a recorded byte stands for"""
+    direction = code % 16
+    decoder = DECODERS.get(code - direction)
+    if decoder is None:
+        raise RecordingError(f"Unknown action code {code}")
+    return decoder(player, direction)
+
+
+class ActionRecorder:
+    """Appends every action the player takes to a recording, flushed as it goes so a crash doesn't lose it"""
+
+    def __init__(self, path: str, seed: int):
+        self.path = path
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(MAGIC + HEADER.pack(RECORDING_FORMAT_VERSION, seed))
+        self._file.flush()
+
+    def record(self, action: Action) -> None:
+        """Call this with every action of the player, before it is performed"""
+        self._file.write(bytes((encode_action(action),)))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def load_recording(path: str) -> Tuple[int, bytes]:
+    """Return the seed and the action codes of a recording"""
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(MAGIC) or len(data) < len(MAGIC) + HEADER.size:
+        raise RecordingError(f"{path} isn't a recording")
+    version, seed = HEADER.unpack_from(data, len(MAGIC))
+    if version != RECORDING_FORMAT_VERSION:
+        raise RecordingError(f"{path} is recording format {version}, expected {RECORDING_FORMAT_VERSION}")
+    return seed, data[len(MAGIC) + HEADER.size:]
+
+
+def replay(
+        path: str, render_every: int = 0, profiler: Optional[Profiler] = None,
+) -> Tuple[headless.GameResult, Engine, Console]:
+    """
+    Play a recording again, rendering to an off-screen console every `render_every` turns (never if 0) and after
+    the last turn. Return how the game went, the engine it ended in and the console holding the last frame
+    """
+    seed, codes = load_recording(path)
+    engine = setup_game.new_game(seed)
+    engine.profiler = profiler
+    player = engine.player
+    console = Console(SCREEN_WIDTH, SCREEN_HEIGHT, order="F")
+
+    turns = 0
+    start = time.perf_counter()
+    for code in codes:
+        if not player.is_alive:
+            break  # Keys pressed after dying aren't turns
+        engine.play_turn(decode_action(code, player))
+        turns += 1
+        if render_every and turns % render_every == 0:
+            render(engine, console)
+    render(engine, console)
+    return headless.GameResult(seed, turns, time.perf_counter() - start, player.is_alive), engine, console
+
+
+def render(engine: Engine, console: Console) -> None:
+    console.clear()
+    engine.render(console)
+    if engine.profiler:
+        engine.profiler.end_frame()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded game headlessly, as fast as possible")
+    parser.add_argument("recording", help="file written by main.py --record")
+    parser.add_argument("--render-every", type=int, default=0, metavar="N", help="render a frame every N turns")
+    parser.add_argument("--final-frame", action="store_true", help="print the last frame as text")
+    parser.add_argument(
+        "--profile", metavar="PATH", help="time every turn and frame and save the timings to PATH, as CSV if it ends "
+                                          "with .csv and JSON otherwise"
+    )
+    args = parser.parse_args()
+    profiler = Profiler() if args.profile else None
+
+    result, _, console = replay(args.recording, args.render_every, profiler)
+    if args.final_frame:
+        lines: List[str] = ["".join(chr(ch) for ch in row) for row in console.ch.T.tolist()]
+        print("\n".join(line.rstrip() for line in lines))
+    print(
+        f"seed {result.seed}: {result.turns} turns in {result.seconds:.3f} s, "
+        f"{result.turns / max(result.seconds, 1e-9):,.0f} turns/s, {'alive' if result.player_alive else 'died'}"
+    )
+    if profiler:
+        profiler.export(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Saving and loading games in a compact binary format
+
+The map arrays are written as they are, entities and fighters as one array per attribute (packed columns)
+and the message log after them. Only the floor the player is on is saved, with the game's seed and the floor's depth
+the other floors are generated again from.
+A save file is the MAGIC bytes, the length of a JSON header, the JSON header listing each array's dtype,
+shape and offset, then the raw bytes of every array.
+The Autosaver writes these saves on a background thread from a snapshot taken between turns.
+"""
+from __future__ import annotations
+
+from array import array
+import concurrent.futures
+import json
+import os
+import struct
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np  # type: ignore
+
+from components.ai import BaseAI, HostileEnemy
+from components.fighter import Fighter
+from engine import Engine
+from entity import Actor, Entity
+from floors import Floors
+from game_map import GameMap
+from message_log import Message
+from procgen import RectangularRoom
+from render_order import RenderOrder
+from setup_game import LevelParams
+import tile_types
+
+MAGIC = b"RLSAVE"
+HEADER_LENGTH = struct.Struct("<I")
+
+# Bump this when the layout of a save changes, older saves are then refused instead of loaded wrong
+SAVE_FORMAT_VERSION = 4
+
+# AI classes that can be saved, by their index in this list. 0 means the entity has no AI (dead or not an actor)
+AI_CLASSES: List[Optional[Type[BaseAI]]] = [None, HostileEnemy]
+
+Snapshot = Dict[str, np.ndarray]
+
+
+class SaveError(Exception):
+    """Raised when a save can't be loaded"""
+
+
+def snapshot(engine: Engine) -> Snapshot:
+    """
+    Copy everything a save needs into new arrays
+    This is the only part of saving that needs the game to hold still, writing the snapshot can happen anywhere
+    """
+    game_map = engine.game_map
+    entities = game_map.store.in_row_order()  # Loaded back into the same rows, which break turn order ties
+    fighters = [getattr(entity, "fighter", None) for entity in entities]
+    message_log = engine.message_log
+    messages = message_log.messages
+    rng_version, rng_words, rng_gauss = engine.rng.getstate()
+
+    floors = engine.floors
+    return {
+        "format_version": np.array(SAVE_FORMAT_VERSION),
+        # Only the current floor is saved, the others are generated again from the seed. Depth 0 is a single map
+        "seed": np.array(floors.seed if floors else 0, dtype=np.uint64),
+        "depth": np.array(floors.depth if floors else 0, dtype=np.int32),
+        "turn": np.array(engine.turn, dtype=np.int64),
+        # The monsters' random number generator carries on where it was, NaN stands for no pending gauss value
+        "rng_version": np.array(rng_version, dtype=np.int32),
+        "rng_words": np.array(rng_words, dtype=np.uint32),
+        "rng_gauss": np.array(np.nan if rng_gauss is None else rng_gauss),
+        # Copied as raw bytes, a structured copy is a lot slower
+        "tiles": game_map.tiles.view(tile_types.tile_raw_dt).copy(order="F").view(tile_types.tile_dt),
+        "visible": game_map.visible.copy(order="F"),
+        "explored": game_map.explored.copy(order="F"),
+        "scent": game_map.scent.copy(order="F"),
+        "rooms": np.array([[room.x1, room.y1, room.x2, room.y2] for room in game_map.rooms], dtype=np.int32),
+        "player_index": np.array(entities.index(engine.player)),
+        "entity_x": np.array([entity.x for entity in entities], dtype=np.int32),
+        "entity_y": np.array([entity.y for entity in entities], dtype=np.int32),
+        "entity_char": np.array([ord(entity.char) for entity in entities], dtype=np.uint32),
+        "entity_color": np.array([entity.color for entity in entities], dtype=np.uint8).reshape(-1, 3),
+        "entity_name": np.array([entity.name for entity in entities], dtype=str),
+        "entity_blocks_movement": np.array([entity.blocks_movement for entity in entities], dtype=bool),
+        "entity_render_order": np.array([entity.render_order.value for entity in entities], dtype=np.uint8),
+        "entity_speed": np.array([entity.speed for entity in entities], dtype=np.int32),
+        "entity_energy": np.array([entity.energy for entity in entities], dtype=np.int32),
+        "entity_ai": np.array(
+            [AI_CLASSES.index(type(entity.ai)) if getattr(entity, "ai", None) else 0 for entity in entities],
+            dtype=np.uint8,
+        ),
+        "has_fighter": np.array([fighter is not None for fighter in fighters], dtype=bool),
+        "fighter_hp": np.array([fighter.hp if fighter else 0 for fighter in fighters], dtype=np.int32),
+        "fighter_max_hp": np.array([fighter.max_hp if fighter else 0 for fighter in fighters], dtype=np.int32),
+        "fighter_defense": np.array([fighter.defense if fighter else 0 for fighter in fighters], dtype=np.int32),
+        "fighter_power": np.array([fighter.power if fighter else 0 for fighter in fighters], dtype=np.int32),
+        "message_text": np.array([message.plain_text for message in messages], dtype=str),
+        "message_fg": np.array([message.fg for message in messages], dtype=np.uint8).reshape(-1, 3),
+        "message_count": np.array([message.count for message in messages], dtype=np.int32),
+        # Where the messages spilled to the history file are in it, main.py keeps that file along with the save
+        "message_spilled": np.array(message_log.spilled, dtype=np.int64),
+        "message_spill_offsets": np.frombuffer(message_log._spill_offsets, dtype=np.int64).copy(),
+    }
+
+
+def write_snapshot(path: str, data: Snapshot) -> None:
+    """Write a snapshot to `path`. The old save is only replaced once the new one is complete"""
+    header: Dict[str, Any] = {}
+    blocks = []
+    offset = 0
+    for name, array in data.items():
+        # Fortran ordered arrays are written transposed, which is the same bytes in C order
+        fortran = array.ndim > 1 and array.flags.f_contiguous
+        block = np.ascontiguousarray(array.T if fortran else array)
+        header[name] = {
+            "dtype": np.lib.format.dtype_to_descr(array.dtype),
+            "shape": array.shape,
+            "fortran": fortran,
+            "offset": offset,
+        }
+        blocks.append(block)
+        offset += block.nbytes
+
+    header_bytes = json.dumps(header).encode()
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC + HEADER_LENGTH.pack(len(header_bytes)) + header_bytes)
+        for block in blocks:
+            file.write(block.data)
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path: str) -> Snapshot:
+    """Read a snapshot written by write_snapshot, the arrays share one buffer with the file's contents"""
+    with open(path, "rb") as file:
+        contents = bytearray(os.fstat(file.fileno()).st_size)
+        file.readinto(contents)
+
+    if not contents.startswith(MAGIC):
+        raise SaveError(f"{path} is not a save file")
+    (header_length,) = HEADER_LENGTH.unpack_from(contents, len(MAGIC))
+    data_start = len(MAGIC) + HEADER_LENGTH.size + header_length
+    header = json.loads(contents[len(MAGIC) + HEADER_LENGTH.size:data_start])
+
+    data: Snapshot = {}
+    for name, info in header.items():
+        dtype = np.lib.format.descr_to_dtype(info["dtype"])
+        shape = tuple(info["shape"])
+        count = int(np.prod(shape))
+        array = np.frombuffer(contents, dtype=dtype, count=count, offset=data_start + info["offset"])
+        data[name] = array.reshape(shape[::-1]).T if info["fortran"] else array.reshape(shape)
+    return data
+
+
+def save_game(engine: Engine, path: str) -> None:
+    write_snapshot(path, snapshot(engine))
+
+
+def load_game(path: str) -> Engine:
+    """Return the game saved at `path` as a new Engine"""
+    data = read_snapshot(path)
+    if int(data["format_version"]) != SAVE_FORMAT_VERSION:
+        raise SaveError(f"{path} was saved in format {int(data['format_version'])}")
+    if data["tiles"].dtype != tile_types.tile_dt:
+        raise SaveError(f"{path} was saved with a different tile layout")
+
+    entities: List[Entity] = []
+    for i in range(len(data["entity_x"])):
+        char = chr(data["entity_char"][i])
+        color = tuple(data["entity_color"][i].tolist())
+        name = str(data["entity_name"][i])
+        if data["has_fighter"][i]:
+            fighter = Fighter(
+                hp=int(data["fighter_max_hp"][i]),
+                defense=int(data["fighter_defense"][i]),
+                power=int(data["fighter_power"][i]),
+            )
+            fighter._hp = int(data["fighter_hp"][i])  # Set directly, the hp setter would kill a 0 hp actor again
+            ai_cls = AI_CLASSES[data["entity_ai"][i]]
+            entity: Entity = Actor(
+                char=char, color=color, name=name, ai_cls=ai_cls or HostileEnemy, fighter=fighter
+            )
+            if ai_cls is None:
+                entity.ai = None  # A dead actor
+        else:
+            entity = Entity(char=char, color=color, name=name)
+        entity.blocks_movement = bool(data["entity_blocks_movement"][i])
+        entity.render_order = RenderOrder(int(data["entity_render_order"][i]))
+        entity.speed = int(data["entity_speed"][i])
+        entity.energy = int(data["entity_energy"][i])
+        entities.append(entity)
+
+    player = entities[int(data["player_index"])]
+    assert isinstance(player, Actor)
+    engine = Engine(player=player)
+
+    width, height = data["tiles"].shape
+    game_map = engine.game_map = GameMap(engine, width, height, tiles=data["tiles"])
+    game_map.visible[:] = data["visible"]
+    game_map.explored[:] = data["explored"]
+    game_map.scent[:] = data["scent"]
+    game_map.rooms.extend(RectangularRoom(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in data["rooms"].tolist())
+    game_map.locate_stairs()
+    for entity, x, y in zip(entities, data["entity_x"].tolist(), data["entity_y"].tolist()):
+        entity.place(x, y, game_map)
+
+    depth = int(data["depth"])
+    if depth:
+        engine.floors = Floors(int(data["seed"]), LevelParams())
+        engine.floors.depth = depth
+
+    engine.turn = int(data["turn"])
+    gauss = float(data["rng_gauss"])
+    engine.rng.setstate(
+        (int(data["rng_version"]), tuple(data["rng_words"].tolist()), None if np.isnan(gauss) else gauss)
+    )
+
+    message_log = engine.message_log
+    for text, fg, count in zip(data["message_text"].tolist(), data["message_fg"].tolist(), data["message_count"]):
+        message = Message(text, tuple(fg))
+        message.count = int(count)
+        message_log.messages.append(message)
+    message_log.spilled = int(data["message_spilled"])
+    message_log._spill_offsets = array("q", data["message_spill_offsets"].tobytes())
+
+    return engine
+
+
+class Autosaver:
+    """Saves the game every `interval` turns, writing the save on a background thread"""
+
+    def __init__(self, path: str, interval: int = 10):
+        self.path = path
+        self.interval = interval
+        self.turns = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave")
+        self._pending: Optional[concurrent.futures.Future] = None
+
+    def on_turn(self, engine: Engine) -> None:
+        """Call this after every turn"""
+        self.turns += 1
+        if self.turns % self.interval:
+            return
+        if self._pending and not self._pending.done():
+            return  # Still writing the last autosave, catch it on the next interval instead of queueing up
+        self._pending = self._executor.submit(write_snapshot, self.path, snapshot(engine))
+
+    def close(self) -> None:
+        """Wait for any autosave still being written"""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,95 @@
+"""
+Turn order of the monsters
+
+Actors have a speed and gain that much energy every turn, each action costs ACTION_COST energy. An actor twice as
+fast as NORMAL_SPEED acts twice a turn, one half as fast every other turn. The actor with the most energy goes first.
+Only active actors gain energy and act. A monster that is asleep and further than ACTIVITY_RADIUS from the player
+becomes dormant, and costs nothing until the player comes back within that radius. The player's scent doesn't
+spread further than that, so monsters that could smell the player are always awake.
+"""
+from __future__ import annotations
+
+import heapq
+from time import perf_counter
+from typing import List, Optional, Set, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+from components.ai import compute_awareness, SCENT_RADIUS, SLEEP
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from entity import Actor
+    from game_map import GameMap
+
+ACTION_COST = 100
+NORMAL_SPEED = 100
+
+# Monsters this close to the player (Chebyshev distance) are always active
+ACTIVITY_RADIUS = 16
+assert ACTIVITY_RADIUS >= SCENT_RADIUS, "Monsters reached by the scent must not be dormant"
+
+
+class Scheduler:
+    """Keeps the active actors of the engine's current map and plays their turns"""
+
+    def __init__(self) -> None:
+        self.game_map: Optional[GameMap] = None  # The map `active` belongs to
+        self.active: Set[Actor] = set()
+
+    def wake_around(self, game_map: GameMap, x: int, y: int, radius: int) -> None:
+        """Wake every living actor within `radius` of x, y, found through the map's spatial index"""
+        for entity in game_map.get_entities_in_radius(x, y, radius):
+            if entity.alive:
+                self.active.add(entity)  # type: ignore
+
+    def play_turn(self, engine: Engine) -> None:
+        """Give every active monster its energy and let them act, the most energetic first"""
+        game_map = engine.game_map
+        if game_map is not self.game_map:
+            # A new or loaded map, whatever is near the player there wakes up below
+            self.game_map = game_map
+            self.active.clear()
+
+        player = engine.player
+        self.wake_around(game_map, player.x, player.y, ACTIVITY_RADIUS)
+        self.active.discard(player)  # The player acts on input, not here
+
+        # Dead actors, and actors no longer on this map, are dropped
+        actors = [actor for actor in self.active if actor.alive and actor in game_map.entities]
+        store = game_map.store
+        rows = store.rows_of(actors)
+
+        # Sleeping monsters far from the player go dormant
+        awareness = compute_awareness(game_map, rows, engine.turn)
+        distance = np.maximum(abs(store.x[rows] - player.x), abs(store.y[rows] - player.y))
+        dormant = (awareness == SLEEP) & (distance > ACTIVITY_RADIUS)
+        self.active = {actor for actor, is_dormant in zip(actors, dormant.tolist()) if not is_dormant}
+        awake = ~dormant
+        rows, awareness = rows[awake], awareness[awake]
+
+        store.energy[rows] += store.speed[rows]
+        # Sorted on most energy first, then on row so actors with the same energy keep a stable order
+        queue: List[Tuple[int, int, int]] = [
+            (-energy, row, level)
+            for energy, row, level in zip(store.energy[rows].tolist(), rows.tolist(), awareness.tolist())
+            if energy >= ACTION_COST
+        ]
+        heapq.heapify(queue)
+        profiler = engine.profiler
+        while queue:
+            _, row, level = heapq.heappop(queue)
+            actor = store.entities[row]
+            if actor is None or not actor.ai:
+                continue  # Killed by an earlier action this turn
+            actor.ai.awareness = level
+            if profiler is None:
+                actor.ai.perform()
+            else:
+                start = perf_counter()
+                actor.ai.perform()
+                profiler.record_ai(perf_counter() - start)
+            store.energy[row] -= ACTION_COST
+            energy = store.energy.item(row)
+            if energy >= ACTION_COST:
+                heapq.heappush(queue, (-energy, row, level))
@@ -0,0 +1,70 @@
+"""Handle the loading and initialization of game sessions"""
+from __future__ import annotations
+
+import random
+from typing import NamedTuple, Optional, TYPE_CHECKING
+
+import color
+from engine import Engine
+import entity_factories
+from floors import Floors
+from procgen import generate_dungeon
+
+if TYPE_CHECKING:
+    from game_map import GameMap
+    from level_cache import LevelCache
+
+map_width = 80
+map_height = 43
+
+room_max_size = 10
+room_min_size = 6
+# Max rooms a floor can have
+max_rooms = 30
+
+max_monsters_per_room = 2
+
+
+class LevelParams(NamedTuple):
+    """Everything generate_dungeon needs besides the engine and the random number generator"""
+    map_width: int = map_width
+    map_height: int = map_height
+    max_rooms: int = max_rooms
+    room_min_size: int = room_min_size
+    room_max_size: int = room_max_size
+    max_monsters_per_room: int = max_monsters_per_room
+
+
+def generate_level(engine: Engine, seed: int, params: LevelParams = LevelParams()) -> GameMap:
+    """Generate the level for `seed`, this doesn't touch the random module"""
+    return generate_dungeon(**params._asdict(), engine=engine, rng=random.Random(seed))
+
+
+def new_game(seed: Optional[int] = None, level_cache: Optional[LevelCache] = None) -> Engine:
+    """
+    Return a brand new game session as an Engine instance
+    Passing a `seed` makes the dungeon, and everything else using the random module, repeatable
+    If a `level_cache` is given the dungeon is loaded from it when it was generated before
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    random.seed(seed)
+
+    player = entity_factories.player.clone()
+
+    engine = Engine(player=player)
+    engine.rng.seed(seed)
+    engine.floors = Floors(seed, LevelParams())
+
+    if level_cache:
+        engine.game_map = level_cache.load_or_generate(engine, seed, LevelParams())
+    else:
+        engine.game_map = generate_level(engine, seed)
+
+    engine.update_fov()
+
+    engine.message_log.add_message(
+        "Hello and welcome, to the adventure zone!", color.welcome_text
+    )
+
+    return engine
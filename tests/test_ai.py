@@ -0,0 +1,37 @@
+"""How hostile monsters pick their moves"""
+from __future__ import annotations
+
+from actions import WaitAction
+from benchmarks.scenarios import build_open_engine
+from components import ai
+import entity_factories
+import tile_types
+
+
+def test_monster_walks_its_own_path_when_the_way_leaves_the_pursuit_field():
+    # A wall between the player and the orc, the way around it goes far past the pursuit field
+    height = ai.PURSUIT_RADIUS * 3
+    engine = build_open_engine(12, height, (4, 2))
+    engine.game_map.set_tiles((6, slice(1, height - 3)), tile_types.wall)
+    orc = entity_factories.orc.spawn(engine.game_map, 8, 2)
+    engine.game_map.visible[:] = True
+
+    assert not engine.pursuit_field.reaches(orc.x, orc.y)
+    orc.ai.perform()
+    assert (orc.x, orc.y) == (8, 3)
+    assert engine.path_cache_misses == 1
+
+    orc.ai.perform()  # The player didn't move, so the path is kept
+    assert (orc.x, orc.y) == (8, 4)
+    assert engine.path_cache_hits == 1
+
+
+def test_monster_wanders_on_a_stale_trail():
+    # Out of sight and a few steps further than the scent stays fresh, where the trail is older than CHASE_SCENT_AGE
+    start = 3 + ai.CHASE_SCENT_AGE + 2, 4
+    engine = build_open_engine(40, 9, (3, 4))
+    orc = entity_factories.orc.spawn(engine.game_map, *start)
+
+    engine.play_turn(WaitAction(engine.player))
+    assert orc.ai.awareness == ai.WANDER
+    assert (orc.x, orc.y) != start
@@ -0,0 +1,45 @@
+"""The movement cost and the spatial index are kept up to date as entities move and die"""
+from __future__ import annotations
+
+import random
+from typing import Dict, Set, Tuple
+
+import numpy as np  # type: ignore
+
+from actions import BumpAction
+from components.ai import DIRECTIONS
+from entity import Entity
+from game_map import GameMap
+import setup_game
+
+# The player kills monsters on the way, so some of them stop blocking
+SEED = 2
+TURNS = 300
+
+
+def rebuilt_cost(game_map: GameMap) -> np.ndarray:
+    cost = np.where(game_map.tiles["walkable"], 1, 0).astype(np.int8)
+    for entity in game_map.entities:
+        if entity.blocks_movement and cost[entity.x, entity.y]:
+            cost[entity.x, entity.y] += 10
+    return cost
+
+
+def rebuilt_index(game_map: GameMap) -> Dict[Tuple[int, int], Set[Entity]]:
+    index: Dict[Tuple[int, int], Set[Entity]] = {}
+    for entity in game_map.entities:
+        index.setdefault((entity.x, entity.y), set()).add(entity)
+    return index
+
+
+def test_cost_and_index_match_a_rebuild():
+    engine = setup_game.new_game(SEED)
+    game_map = engine.game_map
+    rng = random.Random(0)
+    for _ in range(TURNS):
+        if not engine.player.is_alive:
+            break
+        engine.play_turn(BumpAction(engine.player, *rng.choice(DIRECTIONS)))
+        assert (game_map.cost == rebuilt_cost(game_map)).all()
+        assert game_map._entities_by_location == rebuilt_index(game_map)
+    assert any(not entity.blocks_movement for entity in game_map.entities)  # A corpse was left
@@ -0,0 +1,25 @@
+"""Searching the message history"""
+from __future__ import annotations
+
+from tcod.console import Console
+
+from camera import SCREEN_HEIGHT, SCREEN_WIDTH
+from input_handlers import HistoryViewer
+import setup_game
+
+
+def test_search_finds_the_newest_message_then_older_ones():
+    engine = setup_game.new_game(0)
+    for i in range(5):
+        engine.message_log.add_message(f"The orc hits you for {i} hit points.")
+    engine.message_log.add_message("You feel better.")
+    viewer = HistoryViewer(engine)
+    viewer.on_render(Console(SCREEN_WIDTH, SCREEN_HEIGHT, order="F"))
+    assert viewer.index
+
+    viewer.search("feel")
+    assert viewer.index.locate(viewer.cursor)[0] == len(engine.message_log) - 1
+    viewer.search("orc")
+    assert viewer.index.locate(viewer.cursor)[0] == len(engine.message_log) - 2
+    viewer.search("orc", again=True)
+    assert viewer.index.locate(viewer.cursor)[0] == len(engine.message_log) - 3
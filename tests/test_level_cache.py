@@ -0,0 +1,39 @@
+"""The level cache must give back the level that was generated, and cope with broken entries"""
+from __future__ import annotations
+
+import os
+
+from engine import Engine
+import entity_factories
+from level_cache import LevelCache
+import setup_game
+
+SEED = 3
+PARAMS = setup_game.LevelParams()
+
+
+def new_engine() -> Engine:
+    return Engine(player=entity_factories.player.clone())
+
+
+def test_broken_tiles_are_generated_again(tmp_path):
+    level_cache = LevelCache(str(tmp_path))
+    generated = level_cache.load_or_generate(new_engine(), SEED, PARAMS)
+    entry = os.path.join(level_cache.directory, level_cache.key(SEED, PARAMS))
+    with open(os.path.join(entry, "tiles.npy"), "r+b") as file:
+        file.truncate(100)
+
+    assert level_cache.load(new_engine(), SEED, PARAMS) is None
+    regenerated = level_cache.load_or_generate(new_engine(), SEED, PARAMS)
+    assert (regenerated.tiles == generated.tiles).all()
+    assert level_cache.load(new_engine(), SEED, PARAMS) is not None  # Stored again
+
+
+def test_entries_being_written_are_not_evicted(tmp_path):
+    level_cache = LevelCache(str(tmp_path), max_bytes=0)
+    temp_entry = tmp_path / f"{level_cache.key(SEED, PARAMS)}.tmp123"
+    temp_entry.mkdir()
+    (temp_entry / "manifest.json").write_text("{}")
+
+    level_cache.evict()
+    assert temp_entry.exists()
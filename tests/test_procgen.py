@@ -0,0 +1,77 @@
+"""Carving the dungeon as NumPy masks must give the dungeons the tile by tile loops used to"""
+from __future__ import annotations
+
+import random
+from typing import List, Set, Tuple
+
+import numpy as np  # type: ignore
+import pytest
+import tcod
+
+from engine import Engine
+import entity_factories
+from procgen import RectangularRoom
+import setup_game
+
+PARAMS = [
+    setup_game.LevelParams(),
+    setup_game.LevelParams(map_width=200, map_height=120, max_rooms=300, max_monsters_per_room=3),
+]
+
+
+def loop_dungeon(
+        seed: int, params: setup_game.LevelParams
+) -> Tuple[Set[Tuple[int, int]], Tuple[int, int], List[Tuple[str, int, int]]]:
+    """
+    Return the floor tiles, the player's position and the monsters' names and positions, in the order they were
+    spawned, of the dungeon generate_dungeon made when it dug rooms and Bresenham tunnels one tile at a time
+    """
+    rng = random.Random(seed)
+    floor: Set[Tuple[int, int]] = set()
+    rooms: List[RectangularRoom] = []
+    occupied: Set[Tuple[int, int]] = set()
+    monsters: List[Tuple[str, int, int]] = []
+    player = 0, 0
+    for _ in range(params.max_rooms):
+        room_width = rng.randint(params.room_min_size, params.room_max_size)
+        room_height = rng.randint(params.room_min_size, params.room_max_size)
+        x = rng.randint(0, params.map_width - room_width - 1)
+        y = rng.randint(0, params.map_height - room_height - 1)
+        room = RectangularRoom(x, y, room_width, room_height)
+        if any(room.intersects(other) for other in rooms):
+            continue
+
+        floor.update((x, y) for x in range(room.x1 + 1, room.x2) for y in range(room.y1 + 1, room.y2))
+        if not rooms:
+            player = room.center
+            occupied.add(player)
+        else:
+            (x1, y1), (x2, y2) = rooms[-1].center, room.center
+            corner = (x2, y1) if rng.random() < 0.5 else (x1, y2)
+            for start, end in (((x1, y1), corner), (corner, (x2, y2))):
+                floor.update((x, y) for x, y in tcod.los.bresenham(start, end).tolist())
+
+        for _ in range(rng.randint(0, params.max_monsters_per_room)):
+            x = rng.randint(room.x1 + 1, room.x2 - 1)
+            y = rng.randint(room.y1 + 1, room.y2 - 1)
+            if (x, y) not in occupied:
+                occupied.add((x, y))
+                prototype = entity_factories.orc if rng.random() < 0.8 else entity_factories.troll
+                monsters.append((prototype.name, x, y))
+        rooms.append(room)
+    return floor, player, monsters
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("seed", range(10))
+def test_dungeon_matches_the_loops(seed, params):
+    engine = Engine(player=entity_factories.player.clone())
+    dungeon = setup_game.generate_level(engine, seed, params)
+    floor, player, monsters = loop_dungeon(seed, params)
+
+    # The stairs are on a room's center, which is floor too
+    assert set(zip(*np.nonzero(dungeon.tiles["walkable"]))) == floor
+    assert (engine.player.x, engine.player.y) == player
+    assert [
+        (entity.name, entity.x, entity.y) for entity in dungeon.store.in_row_order() if entity is not engine.player
+    ] == monsters
@@ -0,0 +1,46 @@
+"""Replaying a recording must end in the same game as the one that was recorded"""
+from __future__ import annotations
+
+import random
+from typing import Any, List, Tuple
+
+from actions import BumpAction
+from components.ai import DIRECTIONS
+from engine import Engine
+from level_cache import LevelCache
+import replay
+import setup_game
+
+# A long game, the player survives its random walk and kills two monsters on the way
+SEED = 2
+TURNS = 600
+
+
+def game_state(engine: Engine) -> Tuple[int, List[Tuple[Any, ...]], List[str]]:
+    """Everything a divergent replay would show up in: the turn, every entity by row, and the messages"""
+    entities = [
+        (entity.name, entity.x, entity.y, entity.alive, getattr(getattr(entity, "fighter", None), "hp", None))
+        for entity in engine.game_map.store.in_row_order()
+    ]
+    return engine.turn, entities, [message.full_text for message in engine.message_log.messages]
+
+
+def test_replay_of_a_game_on_a_cached_level(tmp_path):
+    level_cache = LevelCache(str(tmp_path / "levels"))
+    setup_game.new_game(SEED, level_cache=level_cache)  # Generates the level and stores it
+    engine = setup_game.new_game(SEED, level_cache=level_cache)  # Loads it from the cache, like main.py does
+
+    path = str(tmp_path / "game.rec")
+    recorder = replay.ActionRecorder(path, SEED)
+    rng = random.Random(0)
+    for _ in range(TURNS):
+        if not engine.player.is_alive:
+            break
+        action = BumpAction(engine.player, *rng.choice(DIRECTIONS))
+        recorder.record(action)
+        engine.play_turn(action)
+    recorder.close()
+
+    result, replayed, _ = replay.replay(path)
+    assert result.player_alive == engine.player.is_alive
+    assert game_state(replayed) == game_state(engine)
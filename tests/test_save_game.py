@@ -0,0 +1,59 @@
+"""A loaded game must be the game that was saved, and play on the same"""
+from __future__ import annotations
+
+import random
+from typing import Any, List, Tuple
+
+from actions import BumpAction
+from components.ai import DIRECTIONS
+from engine import Engine
+import save_game
+import setup_game
+
+SEED = 2
+TURNS = 200
+
+
+def game_state(engine: Engine) -> Tuple[Any, ...]:
+    """The turn, every entity by row, and the whole message history"""
+    entities = []
+    for entity in engine.game_map.store.in_row_order():
+        fighter = getattr(entity, "fighter", None)
+        entities.append((entity.name, entity.x, entity.y, entity.alive, entity.energy, fighter and fighter.hp))
+    message_log = engine.message_log
+    return engine.turn, entities, len(message_log), list(message_log.iter_texts(message_log.history_start))
+
+
+def play(engine: Engine, moves: List[Tuple[int, int]]) -> None:
+    for dx, dy in moves:
+        if engine.player.is_alive:
+            engine.play_turn(BumpAction(engine.player, dx, dy))
+
+
+def test_save_and_load(tmp_path):
+    rng = random.Random(0)
+    moves = [rng.choice(DIRECTIONS) for _ in range(TURNS)]
+
+    engine = setup_game.new_game(SEED)
+    # Few messages in memory, so most of them are spilled to the history file
+    engine.message_log.max_messages = 8
+    engine.message_log.spill_path = str(tmp_path / "history.txt")
+    play(engine, moves[: TURNS // 2])
+    assert engine.message_log.spilled
+
+    save_game.save_game(engine, str(tmp_path / "game.sav"))
+    loaded = save_game.load_game(str(tmp_path / "game.sav"))
+    loaded.message_log.max_messages = 8
+    loaded.message_log.spill_path = engine.message_log.spill_path
+
+    assert game_state(loaded) == game_state(engine)
+    assert (loaded.game_map.scent == engine.game_map.scent).all()
+    assert loaded.rng.getstate() == engine.rng.getstate()
+
+    # The monsters' moves depend on the scent, the turn and the random numbers, so the rest of the game matches too.
+    # The loaded game gets its own copy of the history file, so the two don't append to the same one
+    loaded.message_log.spill_path = str(tmp_path / "loaded_history.txt")
+    (tmp_path / "loaded_history.txt").write_bytes((tmp_path / "history.txt").read_bytes())
+    play(engine, moves[TURNS // 2:])
+    play(loaded, moves[TURNS // 2:])
+    assert game_state(loaded) == game_state(engine)
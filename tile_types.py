@@ -2,7 +2,7 @@ from typing import Tuple
 
 import numpy as np  # type: ignore
 
-# Tile graphics structured type compatible with Console.tiles_rgb
+# Tile graphics structured type compatible with Console.rgb
 graphic_dt = np.dtype(
     [
         ("ch", np.int32),  # Character represented in integer, then translated into Unicode
@@ -21,6 +21,10 @@ tile_dt = np.dtype(
     ]
 )
 
+# Same size as tile_dt, but copied as raw bytes. Copying tiles through this type is a lot faster than
+# copying them field by field as a structured type
+tile_raw_dt = np.dtype((np.void, tile_dt.itemsize))
+
 
 def new_tile(
         *,  # Enforce the use of keywords, so that parameter order doesn't matter
@@ -50,3 +54,16 @@ wall = new_tile(
     dark=(ord(" "), (255, 255, 255), (0, 0, 100)),
     light=(ord(" "), (255, 255, 255), (130, 110, 50)),
 )
+# Stairs lead to the next floor down and back up, procgen puts them in the centers of the last and first rooms
+down_stairs = new_tile(
+    walkable=True,
+    transparent=True,
+    dark=(ord(">"), (0, 0, 100), (50, 50, 150)),
+    light=(ord(">"), (255, 255, 255), (200, 180, 50)),
+)
+up_stairs = new_tile(
+    walkable=True,
+    transparent=True,
+    dark=(ord("<"), (0, 0, 100), (50, 50, 150)),
+    light=(ord("<"), (255, 255, 255), (200, 180, 50)),
+)